@@ -1,39 +1,33 @@
+import time
+_import_started = time.perf_counter()
+
 import os
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, jsonify, after_this_request
+import json
+from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, jsonify, after_this_request, Response, stream_with_context
 from datetime import datetime
-import tempfile
 
 
 from pdf_ops.tools import (
     merge_pdfs, split_pdf, compress_pdf,
     protect_pdf, unlock_pdf, rotate_pdf, watermark_pdf,
-    sign_pdf_with_image, extract_text, pdf_to_docx,
+    sign_pdf_with_image, sign_pdfs_with_image, extract_text, iter_text, pdf_to_docx,
     pdf_to_images, images_to_pdf, office_to_pdf, 
     extract_images, pdf_to_excel, pdf_to_html, pdf_ocr,
-    reorder_pages
+    reorder_pages, compress_report, compress_report_path, ocr_cache_stats, fitz
 )
 import threading, time, zipfile
 from uuid import uuid4
+from task_store import get_task_store
+from jobs import get_executor, QueueFull
+from pdf_ops.backends import IMPORT_TIMES, preload, preload_enabled
+from result_cache import get_result_cache, result_key
+from janitor import start_janitor
+from metrics import get_metrics
+from profiling import PROFILE_DIR, Profiled, artifact_paths, sampled
+import hashlib, hmac, math
+from collections import OrderedDict
 
 
-# Function to clean old files every hour
-def cleanup_old_files():
-    while True:
-        now = time.time()
-        for folder in [UPLOADS, OUTPUTS]:
-            for f in os.listdir(folder):
-                path = os.path.join(folder, f)
-                if os.path.isfile(path) and now - os.path.getmtime(path) > 600:  # 1 hour
-                    try:
-                        os.remove(path)
-                    except:
-                        pass
-        time.sleep(600)  # Check every 10 minutes
-
-# Start cleanup thread
-threading.Thread(target=cleanup_old_files, daemon=True).start()
-
-progress = {}  # track progress per task
 # Allowed file types
 ALLOWED_PDF = {"pdf"}
 ALLOWED_WORD = {"doc", "docx"}
@@ -51,74 +45,401 @@ UPLOADS = os.path.join(BASE_DIR, "uploads")
 OUTPUTS = os.path.join(BASE_DIR, "outputs")
 os.makedirs(UPLOADS, exist_ok=True)
 os.makedirs(OUTPUTS, exist_ok=True)
+os.makedirs(PROFILE_DIR, exist_ok=True)
+
+# Uploads and outputs expire after DOCUMORPH_FILE_TTL (1 hour by default) and are
+# bounded by DOCUMORPH_DISK_QUOTA_MB; one worker sweeps for all (see janitor.py).
+JANITOR = start_janitor([UPLOADS, OUTPUTS, PROFILE_DIR])
+
+# Prometheus metrics shared by all workers, served at /metrics (see metrics.py)
+METRICS = get_metrics()
+
+# Admin-only features (job profiling) are off unless a token is configured
+ADMIN_TOKEN = os.environ.get("DOCUMORPH_ADMIN_TOKEN", "")
+
+def is_admin(req):
+    token = req.headers.get("X-Admin-Token") or req.values.get("admin_token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
 
+def _wants_profile():
+    """Profile this job: an admin asked for it (X-Profile: 1 or profile=1), or it was sampled."""
+    asked = request.headers.get("X-Profile") == "1" or request.values.get("profile") == "1"
+    return (asked and is_admin(request)) or sampled()
 
-# --- Async task registry ---
-TASKS = {}  # task_id -> dict(status, progress, output, error)
+
+# --- Async task registry (shared by all gunicorn workers, see task_store.py) ---
+TASKS = get_task_store()  # task_id -> dict(status, progress, output, error)
 # progress: 0..100, or -1 for error
-# status: 'running' | 'done' | 'error'
+# status: 'queued' | 'running' | 'done' | 'error'
 
 def is_ajax(req):
     return req.headers.get("X-Requested-With") == "XMLHttpRequest"
 
-def _heartbeat(task_id, stop_event):
-    """Increment progress gently up to 95% while the job is running."""
-    while not stop_event.is_set():
-        t = TASKS.get(task_id)
-        if not t: break
-        cur = t.get("progress", 0)
-        if t.get("status") == "running" and cur < 95:
-            TASKS[task_id]["progress"] = min(95, cur + 2)  # smooth climb
-        time.sleep(0.25)
-
-def _package_if_list(task_id, out):
-    """If tool returns multiple files (list), zip them and return the zip path."""
-    if isinstance(out, (list, tuple)):
-        zip_path = os.path.join(OUTPUTS, f"{task_id}.zip")
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            for fp in out:
-                # ensure the file is in OUTPUTS or accessible
-                arcname = os.path.basename(fp)
-                zf.write(fp, arcname)
-        return zip_path
-    return out
-
-def run_async(task_id, func, *args, **kwargs):
-    """Run a tool function in the background; update TASKS[task_id]."""
-    stop_event = threading.Event()
-    TASKS[task_id] = {"status": "running", "progress": 0, "output": None, "error": None}
-
-    def worker():
-        hb = threading.Thread(target=_heartbeat, args=(task_id, stop_event), daemon=True)
-        hb.start()
+# Members with these extensions are already compressed; deflating them again
+# only burns CPU, so they are stored as-is in streamed archives.
+STORED_EXTS = {"png", "jpg", "jpeg", "jp2", "jpx", "gif", "webp", "pdf",
+               "zip", "docx", "xlsx", "pptx"}
+
+class _ZipSink:
+    """Write-only file object collecting ZipFile output for a generator to yield."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+def stream_zip(paths, chunk_size=1024 * 1024):
+    """
+    Generate a ZIP archive of `paths` on the fly. Nothing is written to disk
+    and already-compressed members are stored rather than deflated.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as zf:
+        for fp in paths:
+            if not os.path.isfile(fp):
+                continue
+            ext = fp.rsplit(".", 1)[-1].lower()
+            info = zipfile.ZipInfo.from_file(fp, os.path.basename(fp))
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTS else zipfile.ZIP_DEFLATED
+            with open(fp, "rb") as src, zf.open(info, "w", force_zip64=info.file_size > 0x7FFFFFFF) as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    dst.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+def _result_paths(result):
+    if isinstance(result, (list, tuple)):
+        return [p for p in result if p]
+    return [result] if result else []
+
+def _compress_details(out):
+    """Bytes saved per category, from the report compress_pdf writes next to `out`."""
+    saved = compress_report(out)
+    if not saved:
+        return None
+    return [f"{k.capitalize()}: {v / 1024:.0f} KB saved"
+            for k, v in saved.items() if k in ("total", "images", "fonts", "other")]
+
+# tool -> lines shown with its download, on the sync page and in AJAX results
+RESULT_DETAILS = {"compress_pdf": _compress_details}
+# tool -> files it writes next to its output; cached and restored with the output
+SIDE_FILES = {"compress_pdf": lambda out: [compress_report_path(out)]}
+
+def _result_details(tool, result):
+    if tool in RESULT_DETAILS and isinstance(result, str):
+        return RESULT_DETAILS[tool](result)
+    return None
+
+def _record_result(task_id, result, tool=None):
+    """Mark a task done; multi-file results are downloaded as a streamed ZIP."""
+    JANITOR.track(_result_paths(result))
+    if isinstance(result, (list, tuple)):
+        TASKS.update(task_id, status="done", progress=100, output=None,
+                     outputs=[os.path.basename(p) for p in result])
+    else:
+        TASKS.update(task_id, status="done", progress=100,
+                     output=os.path.basename(result) if result else None,
+                     details=_result_details(tool, result))
+
+def _finish_task(task_id, future, tool=None):
+    """Record the outcome of a finished job in TASKS."""
+    try:
+        _record_result(task_id, future.result(), tool)
+    except Exception as e:
+        TASKS.update(task_id, status="error", progress=-1, error=str(e))
+
+def create_bundle(paths):
+    """
+    Register a list of output files so /archive can stream them as one ZIP.
+    Returns None for an empty list, so result pages offer no empty archive.
+    """
+    if not paths:
+        return None
+    bundle_id = uuid4().hex
+    TASKS.create(bundle_id)
+    _record_result(bundle_id, paths)
+    return bundle_id
+
+@app.route("/archive/<task_id>.zip")
+def download_archive(task_id):
+    t = TASKS.get(task_id)
+    if not t or not t.get("outputs"):
+        flash("File not found.")
+        return redirect(url_for("home"))
+    paths = [os.path.join(OUTPUTS, os.path.basename(name)) for name in t["outputs"]]
+    resp = Response(stream_zip(paths), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = f'attachment; filename="{task_id}.zip"'
+    return resp
+
+def _cache_lookup(func, args, kwargs):
+    """
+    Return (key, base, cached_output) for a tool call; key is None when the
+    call can't be cached (result cache disabled or no uploaded inputs).
+    """
+    cache = get_result_cache(OUTPUTS)
+    if cache is None:
+        return None, None, None
+    uploads, params = [], []
+    for a in args:
+        items = a if isinstance(a, (list, tuple)) else [a]
+        if items and all(_is_upload(x) for x in items):
+            uploads.extend(items)
+        else:
+            params.append(a)
+    if not uploads:
+        return None, None, None
+    key = result_key(func.__name__, [upload_digest(p) for p in uploads],
+                     {"args": params, "kwargs": kwargs})
+    base = os.path.splitext(os.path.basename(uploads[0]))[0]
+    return key, base, cache.lookup(key, base)
+
+def _cache_store(key, base, result, tool=None):
+    if key is not None and result:
+        side = [p for p in SIDE_FILES[tool](result) if os.path.exists(p)] if tool in SIDE_FILES else []
         try:
-            result = func(*args, **kwargs)  # your existing tool function (blocking)
-            result = _package_if_list(task_id, result)
-            TASKS[task_id]["output"] = os.path.basename(result) if result else None
-            TASKS[task_id]["progress"] = 100
-            TASKS[task_id]["status"] = "done"
-        except Exception as e:
-            TASKS[task_id]["status"] = "error"
-            TASKS[task_id]["progress"] = -1
-            TASKS[task_id]["error"] = str(e)
-        finally:
-            stop_event.set()
-
-    threading.Thread(target=worker, daemon=True).start()
+            get_result_cache(OUTPUTS).store(key, base, result, side)
+        except OSError:
+            pass  # caching is best-effort; the result itself is fine
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _pdf_pages(paths):
+    total = 0
+    for p in paths:
+        if p.lower().endswith(".pdf"):
+            try:
+                with fitz.open(p) as doc:
+                    total += doc.page_count
+            except RuntimeError:  # unreadable or encrypted; counted as failures elsewhere
+                pass
+    return total
+
+def _record_run(tool, inputs, started, result=None, error=None):
+    """Run time plus failure, byte and page counts for one tool run, async or sync."""
+    METRICS.observe("documorph_run_seconds", time.time() - started, tool=tool)
+    if error is not None:
+        METRICS.inc("documorph_failures_total", tool=tool, exception=type(error).__name__)
+        return
+    METRICS.inc("documorph_input_bytes_total", sum(_size(p) for p in inputs), tool=tool)
+    METRICS.inc("documorph_output_bytes_total", sum(_size(p) for p in _result_paths(result)), tool=tool)
+    METRICS.inc("documorph_pages_total", _pdf_pages(inputs), tool=tool)
+
+def _profile_header(profile_id):
+    @after_this_request
+    def add_header(resp):
+        resp.headers["X-Profile-Id"] = profile_id
+        return resp
+
+def call_tool(func, *args, **kwargs):
+    """Run a tool synchronously, reusing a cached result for identical input and params."""
+    tool = func.__name__
+    METRICS.inc("documorph_requests_total", tool=tool, mode="sync")
+    token = uuid4().hex
+    if _wants_profile():
+        # a cache hit would leave nothing to profile
+        key, base, cached = None, None, None
+        func = Profiled(func, token)
+        _profile_header(token)
+    else:
+        key, base, cached = _cache_lookup(func, args, kwargs)
+    if cached:
+        METRICS.inc("documorph_result_cache_hits_total", tool=tool)
+        JANITOR.track(_result_paths(cached))
+        return cached
+    inputs = _input_paths(args)
+    JANITOR.pin(token, inputs)
+    METRICS.gauge_add("documorph_active_jobs", 1, tool=tool, state="running")
+    started = time.time()
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        _record_run(tool, inputs, started, error=e)
+        raise
+    finally:
+        METRICS.gauge_add("documorph_active_jobs", -1, tool=tool, state="running")
+        JANITOR.unpin(token)
+    _record_run(tool, inputs, started, result=result)
+    JANITOR.track(_result_paths(result))
+    if isinstance(func, Profiled):
+        JANITOR.track(artifact_paths(token))
+    _cache_store(key, base, result, tool)
+    return result
 
-@app.route("/progress/<task_id>")
-def task_progress(task_id):
-    t = TASKS.get(task_id, {"status": "unknown", "progress": 0})
+def run_async(task_id, func, *args, **kwargs):
+    """
+    Queue a tool function on the job executor. Tools that take a `progress`
+    callback report real per-page progress into TASKS[task_id]. A cached
+    result completes the task immediately without queueing anything.
+    """
+    tool = func.__name__
+    METRICS.inc("documorph_requests_total", tool=tool, mode="async")
+    profiled = _wants_profile()
+    if profiled:
+        key, base, cached = None, None, None
+        func = Profiled(func, task_id)
+    else:
+        key, base, cached = _cache_lookup(func, args, kwargs)
+    if cached:
+        METRICS.inc("documorph_result_cache_hits_total", tool=tool)
+        TASKS.create(task_id)
+        _record_result(task_id, cached, tool)
+        return
+
+    inputs = _input_paths(args)
+    queued = time.time()
+    started = []
+
+    def on_start(task_id):
+        started.append(time.time())
+        METRICS.observe("documorph_queue_wait_seconds", started[0] - queued, tool=tool)
+        METRICS.gauge_add("documorph_active_jobs", -1, tool=tool, state="queued")
+        METRICS.gauge_add("documorph_active_jobs", 1, tool=tool, state="running")
+
+    def on_done(task_id, future):
+        METRICS.gauge_add("documorph_active_jobs", -1, tool=tool, state="running")
+        error = future.exception()
+        _record_run(tool, inputs, started[0] if started else queued,
+                    result=None if error else future.result(), error=error)
+        JANITOR.unpin(task_id)
+        if profiled:
+            JANITOR.track(artifact_paths(task_id))
+        if error is None:
+            _cache_store(key, base, future.result(), tool)
+        _finish_task(task_id, future, tool)
+
+    # inputs of queued and running jobs are never expired or evicted
+    JANITOR.pin(task_id, inputs)
+    METRICS.gauge_add("documorph_active_jobs", 1, tool=tool, state="queued")
+    try:
+        get_executor(TASKS).submit(task_id, func, args, kwargs, on_done=on_done, on_start=on_start)
+        if profiled:
+            TASKS.update(task_id, profiled=True)
+    except QueueFull:
+        METRICS.gauge_add("documorph_active_jobs", -1, tool=tool, state="queued")
+        METRICS.inc("documorph_rejected_total", tool=tool)
+        JANITOR.unpin(task_id)
+        raise
+
+@app.errorhandler(QueueFull)
+def queue_full(e):
+    resp = jsonify({"status": "busy", "error": str(e)})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(e.retry_after)
+    return resp
+
+def _progress_payload(task_id, t):
+    t = t or {"status": "unknown", "progress": 0}
     resp = {"status": t.get("status"), "progress": t.get("progress", 0)}
+    if t.get("status") == "queued":
+        resp["position"] = t.get("position", 0)
+    if t.get("status") == "running" and t.get("eta") is not None:
+        resp["eta"] = t["eta"]
+    if t.get("status") == "done" and t.get("details"):
+        resp["details"] = t["details"]
     if t.get("status") == "done" and t.get("output"):
         resp["download_url"] = url_for("download", filename=t["output"])
+    elif t.get("status") == "done" and t.get("outputs"):
+        resp["download_url"] = url_for("download_archive", task_id=task_id)
     if t.get("status") == "error":
         resp["error"] = t.get("error")
-    return jsonify(resp)
+    if t.get("profiled") and t.get("status") in ("done", "error"):
+        resp["profile_url"] = url_for("job_profile", task_id=task_id)
+    return resp
+
+@app.route("/progress/<task_id>")
+def task_progress(task_id):
+    return jsonify(_progress_payload(task_id, TASKS.get(task_id)))
+
+# Server-Sent Events: the stream checks the (cheap) task row itself and only
+# sends an event when its version changes. Each open stream holds a gthread
+# thread, so a stream is closed after STREAM_MAX_SECONDS (EventSource
+# reconnects on its own) and at most STREAM_MAX_OPEN run per worker; beyond
+# that the stream is refused with 503 and script.js falls back to polling,
+# which leaves threads free for uploads and downloads.
+STREAM_POLL_SECONDS = 0.5
+STREAM_KEEPALIVE_SECONDS = 10
+STREAM_MAX_SECONDS = 15
+STREAM_MAX_OPEN = int(os.environ.get("DOCUMORPH_MAX_STREAMS", "4"))
+_open_streams = threading.BoundedSemaphore(STREAM_MAX_OPEN)
+
+@app.route("/progress/<task_id>/stream")
+def task_progress_stream(task_id):
+    if not _open_streams.acquire(blocking=False):
+        return jsonify({"status": "busy", "error": "Too many progress streams; poll /progress instead."}), 503
+
+    def events():
+        yield "retry: 1000\n\n"
+        started = last_sent = time.time()
+        version = None
+        while True:
+            t = TASKS.get(task_id)
+            now = time.time()
+            if version is None or (t or {}).get("version") != version:
+                version = (t or {}).get("version", 0)
+                payload = _progress_payload(task_id, t)
+                yield f"data: {json.dumps(payload)}\n\n"
+                last_sent = now
+                if payload["status"] in ("done", "error", "unknown"):
+                    return
+            elif now - last_sent > STREAM_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = now
+            if now - started > STREAM_MAX_SECONDS:
+                return
+            time.sleep(STREAM_POLL_SECONDS)
+
+    resp = Response(stream_with_context(events()), mimetype="text/event-stream")
+    resp.call_on_close(_open_streams.release)  # runs even if the client left before the first event
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # don't let a reverse proxy buffer events
+    return resp
 
 def allowed(filename, exts):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in exts
 
+class InvalidOption(ValueError):
+    """A form field that can't be used; AJAX gets a 400, the form is shown again."""
+
+@app.errorhandler(InvalidOption)
+def invalid_option(e):
+    if is_ajax(request):
+        return jsonify({"error": str(e)}), 400
+    flash(str(e))
+    return redirect(request.url)
+
+def form_number(name, label, default, lo=None, hi=None, kind=int):
+    """
+    Numeric form field clamped to [lo, hi]; blank means `default`. Anything
+    that isn't a finite number raises InvalidOption.
+    """
+    raw = request.form.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = kind(raw)
+    except ValueError:
+        raise InvalidOption(f"{label} must be a number.") from None
+    if not math.isfinite(value):
+        raise InvalidOption(f"{label} must be a number.")
+    if lo is not None:
+        value = max(lo, value)
+    if hi is not None:
+        value = min(hi, value)
+    return value
+
 @app.route("/")
 def home():
     return render_template("index.html")
@@ -149,13 +470,14 @@ def download(filename):
 def merge():
     if request.method == "POST":
         files = request.files.getlist("files")
-        paths = []
+        paths, titles = [], []
         for f in files:
             if not f or f.filename.strip() == "":
                 continue
             try:
                 p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF)
                 paths.append(p)
+                titles.append(os.path.splitext(os.path.basename(f.filename))[0])
             except ValueError:
                 flash(f"Invalid file skipped: {f.filename}")
         if not paths:
@@ -164,10 +486,10 @@ def merge():
 
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, merge_pdfs, paths)  # list is passed as single arg
+            run_async(task_id, merge_pdfs, paths, titles=titles)  # list is passed as single arg
             return jsonify({"task_id": task_id})
         else:
-            out = merge_pdfs(paths)
+            out = call_tool(merge_pdfs, paths, titles=titles)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -181,18 +503,34 @@ def merge():
 def split():
     if request.method == "POST":
         f = request.files.get("file")
+        mode = request.form.get("mode", "pages")
+        value = request.form.get("value", "").strip() or None
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Please upload a PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, split_pdf, p)  # returns list -> zipped for AJAX
+            run_async(task_id, split_pdf, p, mode=mode, value=value)  # returns list -> zipped for AJAX
             return jsonify({"task_id": task_id})
         else:
-            outs = split_pdf(p)
-            return render_template("result_links.html", files=[os.path.basename(x) for x in outs], title="Split Result")
-
-    return render_template("tool_upload.html", title="Split PDF", accept=".pdf")
+            try:
+                outs = call_tool(split_pdf, p, mode=mode, value=value)
+            except ValueError as e:
+                flash(str(e)); return redirect(request.url)
+            return render_template("result_links.html", files=[os.path.basename(x) for x in outs],
+                                   archive=create_bundle(outs), title="Split Result")
+
+    return render_template("tool_upload.html", title="Split PDF", accept=".pdf", extra_controls="""
+    <label class='lbl'>Split</label>
+    <select name="mode" class="input">
+      <option value="pages">Every page</option>
+      <option value="ranges">By page ranges</option>
+      <option value="every">Every N pages</option>
+      <option value="size">By file size (MB)</option>
+    </select>
+    <label class='lbl'>Ranges / N / MB (e.g. 1-3,4-10 or 5)</label>
+    <input type="text" name="value" class="input">
+    """)
 
 # -------- Compress --------
 @app.route("/compress", methods=["GET", "POST"])
@@ -200,20 +538,22 @@ def compress():
     if request.method == "POST":
         f = request.files.get("file")
         quality = request.form.get("quality", "screen")
+        engine = request.form.get("engine", "native")
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Please upload a PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, compress_pdf, p, quality=quality)
+            run_async(task_id, compress_pdf, p, quality=quality, engine=engine)
             return jsonify({"task_id": task_id})
         else:
-            out = compress_pdf(p, quality=quality)
+            out = call_tool(compress_pdf, p, quality=quality, engine=engine)
+            details = _compress_details(out)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
                 out = new_out
-            return render_template("result_single.html", file=os.path.basename(out))
+            return render_template("result_single.html", file=os.path.basename(out), details=details)
 
     return render_template("tool_upload.html", title="Compress PDF", accept=".pdf", extra_controls="""
     <label class='lbl'>Quality</label>
@@ -223,6 +563,11 @@ def compress():
       <option value="printer">Printer</option>
       <option value="prepress">Prepress</option>
     </select>
+    <label class='lbl'>Engine</label>
+    <select name="engine" class="input">
+      <option value="native">Built-in</option>
+      <option value="gs">Ghostscript</option>
+    </select>
     """)
 
 # -------- PDF to Word --------
@@ -238,7 +583,7 @@ def pdf_to_word():
             run_async(task_id, pdf_to_docx, p)
             return jsonify({"task_id": task_id})
         else:
-            out = pdf_to_docx(p)
+            out = call_tool(pdf_to_docx, p)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -253,16 +598,26 @@ def pdf_to_images_route():
     if request.method == "POST":
         f = request.files.get("file")
         fmt = request.form.get("fmt", "png")
+        opts = {
+            "dpi": form_number("dpi", "DPI", 72, 36, 600),
+            "gray": request.form.get("color", "rgb") == "gray",
+            "quality": form_number("quality", "Quality", 85, 1, 100),
+            "pages": request.form.get("pages", "").strip() or None,
+        }
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Please upload a PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, pdf_to_images, p, fmt=fmt)  # list -> zipped
+            run_async(task_id, pdf_to_images, p, fmt=fmt, **opts)  # list -> zipped
             return jsonify({"task_id": task_id})
         else:
-            outs = pdf_to_images(p, fmt=fmt)
-            return render_template("result_links.html", files=[os.path.basename(x) for x in outs], title="PDF to Images")
+            try:
+                outs = call_tool(pdf_to_images, p, fmt=fmt, **opts)
+            except ValueError as e:
+                flash(str(e)); return redirect(request.url)
+            return render_template("result_links.html", files=[os.path.basename(x) for x in outs],
+                                   archive=create_bundle(outs), title="PDF to Images")
 
     return render_template("tool_upload.html", title="PDF to Images", accept=".pdf", extra_controls="""
     <label class='lbl'>Format</label>
@@ -270,6 +625,21 @@ def pdf_to_images_route():
       <option value="png">PNG</option>
       <option value="jpg">JPG</option>
     </select>
+    <label class='lbl'>Resolution</label>
+    <select name="dpi" class="input">
+      <option value="72">72 DPI (thumbnail)</option>
+      <option value="150">150 DPI</option>
+      <option value="300">300 DPI (print)</option>
+    </select>
+    <label class='lbl'>Color</label>
+    <select name="color" class="input">
+      <option value="rgb">Color</option>
+      <option value="gray">Grayscale</option>
+    </select>
+    <label class='lbl'>JPG Quality (1-100)</label>
+    <input type="number" name="quality" min="1" max="100" value="85" class="input">
+    <label class='lbl'>Pages (optional, e.g. 1-5,8)</label>
+    <input type="text" name="pages" class="input" placeholder="all">
     """)
 
 # -------- Images to PDF --------
@@ -290,7 +660,7 @@ def images_to_pdf_route():
             run_async(task_id, images_to_pdf, paths)
             return jsonify({"task_id": task_id})
         else:
-            out = images_to_pdf(paths)
+            out = call_tool(images_to_pdf, paths)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -313,7 +683,7 @@ def office_to_pdf_route():
             return jsonify({"task_id": task_id})
         else:
             try:
-                out = office_to_pdf(p)
+                out = call_tool(office_to_pdf, p)
                 if os.path.dirname(out) != OUTPUTS:
                     new_out = os.path.join(OUTPUTS, os.path.basename(out))
                     os.rename(out, new_out)
@@ -330,19 +700,31 @@ def watermark():
     if request.method == "POST":
         pdf = request.files.get("file")
         wm = request.files.get("watermark")
+        opts = {
+            "text": request.form.get("text", "").strip() or None,
+            "opacity": form_number("opacity", "Opacity", 1.0, 0.0, 1.0, kind=float),
+            "position": request.form.get("position", "fill"),
+            "pages": request.form.get("pages", "all").strip() or "all",
+        }
         if not pdf or not allowed(pdf.filename, ALLOWED_PDF):
             flash("Upload a PDF."); return redirect(request.url)
-        if not wm or not allowed(wm.filename, ALLOWED_PDF):
+        has_wm = wm and wm.filename.strip()
+        if has_wm and not allowed(wm.filename, ALLOWED_PDF):
             flash("Upload a watermark PDF (single page)."); return redirect(request.url)
+        if not has_wm and not opts["text"]:
+            flash("Upload a watermark PDF or enter watermark text."); return redirect(request.url)
         p1 = save_uploaded_file(pdf, UPLOADS, ALLOWED_PDF)
-        p2 = save_uploaded_file(wm, UPLOADS, ALLOWED_PDF)
+        p2 = save_uploaded_file(wm, UPLOADS, ALLOWED_PDF) if has_wm else None
 
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, watermark_pdf, p1, p2)
+            run_async(task_id, watermark_pdf, p1, p2, **opts)
             return jsonify({"task_id": task_id})
         else:
-            out = watermark_pdf(p1, p2)
+            try:
+                out = call_tool(watermark_pdf, p1, p2, **opts)
+            except ValueError as e:
+                flash(str(e)); return redirect(request.url)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -353,7 +735,7 @@ def watermark():
     <label class="lbl upload-label">Watermark PDF</label>
 
     <div class="file-upload-container">
-    <input type="file" name="watermark" id="watermarkInput" accept=".pdf" hidden required>
+    <input type="file" name="watermark" id="watermarkInput" accept=".pdf" hidden>
 
     <!-- Cyberpunk Choose File Button -->
     <label for="watermarkInput" class="cyberpunk-btn" data-text="Choose File">
@@ -370,6 +752,22 @@ def watermark():
     document.getElementById('watermark-file-name').textContent = fileName;
     });
     </script>
+
+    <label class='lbl'>...or Watermark Text</label>
+    <input type="text" name="text" class="input" placeholder="CONFIDENTIAL">
+    <label class='lbl'>Opacity</label>
+    <input type="number" name="opacity" min="0.05" max="1" step="0.05" value="0.3" class="input">
+    <label class='lbl'>Position</label>
+    <select name="position" class="input">
+      <option value="fill">Whole page</option>
+      <option value="center">Center</option>
+      <option value="top-left">Top left</option>
+      <option value="top-right">Top right</option>
+      <option value="bottom-left">Bottom left</option>
+      <option value="bottom-right">Bottom right</option>
+    </select>
+    <label class='lbl'>Pages (all, first, last or e.g. 1,3-5)</label>
+    <input type="text" name="pages" value="all" class="input">
     """)
 
 # -------- Rotate --------
@@ -377,7 +775,9 @@ def watermark():
 def rotate():
     if request.method == "POST":
         f = request.files.get("file")
-        angle = int(request.form.get("angle", "90"))
+        angle = form_number("angle", "Angle", 90)
+        if angle not in (90, 180, 270):
+            raise InvalidOption("Angle must be 90, 180 or 270.")
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Upload a PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
@@ -386,7 +786,7 @@ def rotate():
             run_async(task_id, rotate_pdf, p, angle=angle)
             return jsonify({"task_id": task_id})
         else:
-            out = rotate_pdf(p, angle=angle)
+            out = call_tool(rotate_pdf, p, angle=angle)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -418,7 +818,7 @@ def protect():
             run_async(task_id, protect_pdf, p, pwd)
             return jsonify({"task_id": task_id})
         else:
-            out = protect_pdf(p, pwd)
+            out = call_tool(protect_pdf, p, pwd)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -444,7 +844,7 @@ def unlock():
             return jsonify({"task_id": task_id})
         else:
             try:
-                out = unlock_pdf(p, pwd)
+                out = call_tool(unlock_pdf, p, pwd)
                 if os.path.dirname(out) != OUTPUTS:
                     new_out = os.path.join(OUTPUTS, os.path.basename(out))
                     os.rename(out, new_out)
@@ -460,54 +860,125 @@ def unlock():
 
 
 # -------- Extract Text --------
+TEXT_MIMETYPES = {"text": "text/plain", "blocks": "text/plain", "json": "application/x-ndjson"}
+
+def _text_options():
+    fmt = request.form.get("format", "text")
+    if fmt not in TEXT_MIMETYPES:
+        raise ValueError("Invalid text format.")
+    return fmt, request.form.get("parallel") == "on"
+
 @app.route("/extract-text", methods=["GET", "POST"])
 def extract_text_route():
     if request.method == "POST":
         f = request.files.get("file")
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Upload a PDF."); return redirect(request.url)
+        try:
+            fmt, parallel = _text_options()
+        except ValueError as e:
+            flash(str(e)); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, extract_text, p)
+            run_async(task_id, extract_text, p, fmt=fmt, parallel=parallel)
             return jsonify({"task_id": task_id})
         else:
-            out = extract_text(p)
+            out = call_tool(extract_text, p, fmt=fmt, parallel=parallel)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
                 out = new_out
             return render_template("result_single.html", file=os.path.basename(out))
 
-    return render_template("tool_upload.html", title="Extract Text", accept=".pdf")
+    return render_template("tool_upload.html", title="Extract Text", accept=".pdf", extra_controls="""
+    <label class='lbl'>Format</label>
+    <select name="format" class="input">
+      <option value="text" selected>Plain text</option>
+      <option value="blocks">Text blocks</option>
+      <option value="json">JSON lines with coordinates</option>
+    </select>
+    <label class='lbl'><input type="checkbox" name="parallel"> Parallel (large documents)</label>
+    """)
+
+@app.route("/extract-text/stream", methods=["POST"])
+def extract_text_stream():
+    """
+    Same options as /extract-text, but the text is sent back page by page as
+    a chunked response while extraction runs, e.g.
+    curl -N -F file=@big.pdf -F format=json https://host/extract-text/stream
+    """
+    f = request.files.get("file")
+    if not f or not allowed(f.filename, ALLOWED_PDF):
+        return jsonify({"error": "Upload a PDF."}), 400
+    try:
+        fmt, parallel = _text_options()
+        p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    token = uuid4().hex
+    JANITOR.pin(token, [p])
+    METRICS.inc("documorph_requests_total", tool="extract_text", mode="stream")
+
+    def generate():
+        started = time.time()
+        METRICS.gauge_add("documorph_active_jobs", 1, tool="extract_text", state="running")
+        try:
+            yield from iter_text(p, fmt, parallel)
+        except Exception as e:
+            _record_run("extract_text", [p], started, error=e)
+            raise
+        else:
+            METRICS.observe("documorph_run_seconds", time.time() - started, tool="extract_text")
+            METRICS.inc("documorph_input_bytes_total", _size(p), tool="extract_text")
+            METRICS.inc("documorph_pages_total", _pdf_pages([p]), tool="extract_text")
+        finally:
+            METRICS.gauge_add("documorph_active_jobs", -1, tool="extract_text", state="running")
+            JANITOR.unpin(token)
+
+    resp = Response(stream_with_context(generate()), mimetype=TEXT_MIMETYPES[fmt])
+    resp.headers["X-Accel-Buffering"] = "no"  # don't let a proxy buffer the stream
+    return resp
 
 # -------- Sign (image) --------
 @app.route("/sign", methods=["GET", "POST"])
 def sign():
     if request.method == "POST":
-        pdf = request.files.get("file")
+        pdfs = [f for f in request.files.getlist("files") if f and f.filename.strip()]
         img = request.files.get("image")
-        scale = float(request.form.get("scale", "0.25"))
-        if not pdf or not allowed(pdf.filename, ALLOWED_PDF):
+        scale = form_number("scale", "Size", 0.25, 0.1, 0.5, kind=float)
+        pages = request.form.get("pages", "all").strip() or "all"
+        if not pdfs or not all(allowed(f.filename, ALLOWED_PDF) for f in pdfs):
             flash("Upload a PDF."); return redirect(request.url)
         if not img or not allowed(img.filename, ALLOWED_IMAGE):
             flash("Upload a PNG/JPG signature image."); return redirect(request.url)
-        p1 = save_uploaded_file(pdf, UPLOADS, ALLOWED_PDF)
+        paths = [save_uploaded_file(f, UPLOADS, ALLOWED_PDF) for f in pdfs]
         p2 = save_uploaded_file(img, UPLOADS, ALLOWED_IMAGE)
 
+        # one PDF -> single result; several -> batch sharing one signature image
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, sign_pdf_with_image, p1, p2, scale=scale)
+            if len(paths) == 1:
+                run_async(task_id, sign_pdf_with_image, paths[0], p2, scale=scale, pages=pages)
+            else:
+                run_async(task_id, sign_pdfs_with_image, paths, p2, scale=scale, pages=pages)
             return jsonify({"task_id": task_id})
         else:
-            out = sign_pdf_with_image(p1, p2, scale=scale)
+            try:
+                if len(paths) > 1:
+                    outs = call_tool(sign_pdfs_with_image, paths, p2, scale=scale, pages=pages)
+                    return render_template("result_links.html", files=[os.path.basename(x) for x in outs],
+                                           archive=create_bundle(outs), title="Signed PDFs")
+                out = call_tool(sign_pdf_with_image, paths[0], p2, scale=scale, pages=pages)
+            except ValueError as e:
+                flash(str(e)); return redirect(request.url)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
                 out = new_out
             return render_template("result_single.html", file=os.path.basename(out))
 
-    return render_template("tool_upload.html", title="Sign PDF", accept=".pdf", extra_controls="""
+    return render_template("tool_upload.html", title="Sign PDF", multiple=True, accept=".pdf", extra_controls="""
     <label class="lbl upload-label">Signature image (PNG/JPG)</label>
 
     <div class="file-upload-container">
@@ -524,6 +995,9 @@ def sign():
 
     <label class="lbl upload-label">Size (page width fraction)</label>
     <input type="number" name="scale" min="0.1" max="0.5" step="0.05" value="0.25" class="input">
+
+    <label class="lbl upload-label">Pages (all, first, last or e.g. 1,3-5)</label>
+    <input type="text" name="pages" value="all" class="input">
     """)
 
 # -------- Extract Images --------
@@ -531,20 +1005,38 @@ def sign():
 def extract_images_route():
     if request.method == "POST":
         f = request.files.get("file")
+        min_px = form_number("min_px", "Minimum size (px)", 0, 0)
+        opts = {
+            "mode": request.form.get("mode", "native"),
+            "min_bytes": form_number("min_kb", "Minimum size (KB)", 0, 0) * 1024,
+            "min_width": min_px,
+            "min_height": min_px,
+        }
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Upload a PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, extract_images, p)  # returns list -> zipped
+            run_async(task_id, extract_images, p, **opts)  # returns list -> zipped
             return jsonify({"task_id": task_id})
         else:
-            outs = extract_images(p)
+            outs = call_tool(extract_images, p, **opts)
             return render_template("result_links.html",
                                    files=[os.path.basename(x) for x in outs],
+                                   archive=create_bundle(outs),
                                    title="Extracted Images")
 
-    return render_template("tool_upload.html", title="Extract Images", accept=".pdf")
+    return render_template("tool_upload.html", title="Extract Images", accept=".pdf", extra_controls="""
+    <label class='lbl'>Format</label>
+    <select name="mode" class="input">
+      <option value="native">Original (no re-encoding)</option>
+      <option value="png">Convert all to PNG</option>
+    </select>
+    <label class='lbl'>Skip images smaller than (px)</label>
+    <input type="number" name="min_px" min="0" value="0" class="input">
+    <label class='lbl'>Skip files smaller than (KB)</label>
+    <input type="number" name="min_kb" min="0" value="0" class="input">
+    """)
 
 
 # -------- PDF to Excel --------
@@ -560,7 +1052,7 @@ def pdf_to_excel_route():
             run_async(task_id, pdf_to_excel, p)
             return jsonify({"task_id": task_id})
         else:
-            out = pdf_to_excel(p)
+            out = call_tool(pdf_to_excel, p)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -575,22 +1067,32 @@ def pdf_to_excel_route():
 def pdf_to_html_route():
     if request.method == "POST":
         f = request.files.get("file")
+        layout = request.form.get("layout", "positioned")
+        per_page = request.form.get("per_page") == "on"
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Upload a PDF."); return redirect(request.url)
+        if layout not in ("positioned", "xhtml"):
+            flash("Invalid layout."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, pdf_to_html, p)
+            run_async(task_id, pdf_to_html, p, layout=layout, per_page=per_page)
             return jsonify({"task_id": task_id})
         else:
-            out = pdf_to_html(p)
-            if os.path.dirname(out) != OUTPUTS:
-                new_out = os.path.join(OUTPUTS, os.path.basename(out))
-                os.rename(out, new_out)
-                out = new_out
+            out = call_tool(pdf_to_html, p, layout=layout, per_page=per_page)
+            if isinstance(out, list):  # page files and/or image assets
+                return render_template("result_links.html", files=[os.path.basename(x) for x in out],
+                                       archive=create_bundle(out), title="PDF to HTML")
             return render_template("result_single.html", file=os.path.basename(out))
 
-    return render_template("tool_upload.html", title="PDF to HTML", accept=".pdf")
+    return render_template("tool_upload.html", title="PDF to HTML", accept=".pdf", extra_controls="""
+    <label class='lbl'>Layout</label>
+    <select name="layout" class="input">
+      <option value="positioned" selected>Keep page layout</option>
+      <option value="xhtml">Reflowable XHTML</option>
+    </select>
+    <label class='lbl'><input type="checkbox" name="per_page"> One HTML file per page</label>
+    """)
 
 
 # -------- OCR PDF --------
@@ -599,15 +1101,16 @@ def pdf_ocr_route():
     if request.method == "POST":
         f = request.files.get("file")
         lang = request.form.get("lang", "eng")
+        dpi = form_number("dpi", "DPI", 300, 150, 400)
         if not f or not allowed(f.filename, ALLOWED_PDF):
             flash("Upload a scanned PDF."); return redirect(request.url)
         p = save_uploaded_file(f, UPLOADS, ALLOWED_PDF);
         if is_ajax(request):
             task_id = uuid4().hex
-            run_async(task_id, pdf_ocr, p, lang=lang)
+            run_async(task_id, pdf_ocr, p, lang=lang, dpi=dpi)
             return jsonify({"task_id": task_id})
         else:
-            out = pdf_ocr(p, lang=lang)
+            out = call_tool(pdf_ocr, p, lang=lang, dpi=dpi)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -617,6 +1120,13 @@ def pdf_ocr_route():
     return render_template("tool_upload.html", title="OCR PDF", accept=".pdf", extra_controls="""
     <label class='lbl'>Language</label>
     <input type="text" name="lang" value="eng" class="input" placeholder="eng, deu, fra, ...">
+    <label class='lbl'>Resolution</label>
+    <select name="dpi" class="input">
+      <option value="150">150 DPI (fast)</option>
+      <option value="200">200 DPI</option>
+      <option value="300" selected>300 DPI</option>
+      <option value="400">400 DPI (small print)</option>
+    </select>
     """)
 
 
@@ -643,7 +1153,7 @@ def reorder_pages_route():
             run_async(task_id, reorder_pages, p, order_list)
             return jsonify({"task_id": task_id})
         else:
-            out = reorder_pages(p, order_list)
+            out = call_tool(reorder_pages, p, order_list)
             if os.path.dirname(out) != OUTPUTS:
                 new_out = os.path.join(OUTPUTS, os.path.basename(out))
                 os.rename(out, new_out)
@@ -656,6 +1166,32 @@ def reorder_pages_route():
     """)
 
 
+# sha256 of recent uploads, computed while they are written to disk
+_UPLOAD_DIGESTS = OrderedDict()
+_UPLOAD_DIGESTS_MAX = 1024
+_upload_digests_lock = threading.Lock()
+
+def _is_upload(p):
+    return isinstance(p, str) and os.path.dirname(os.path.abspath(p)) == UPLOADS
+
+def _input_paths(args):
+    """Uploaded files among a tool's positional arguments (single paths or lists)."""
+    paths = []
+    for a in args:
+        paths.extend(x for x in (a if isinstance(a, (list, tuple)) else [a]) if _is_upload(x))
+    return paths
+
+def upload_digest(path):
+    with _upload_digests_lock:
+        digest = _UPLOAD_DIGESTS.get(path)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+    return digest
+
 def save_uploaded_file(f, folder, allowed_exts=None):
     # Check if file exists
     if not f or f.filename.strip() == "":
@@ -670,10 +1206,66 @@ def save_uploaded_file(f, folder, allowed_exts=None):
     unique_name = f"{uuid4().hex}.{ext}"
     path = os.path.join(folder, unique_name)
 
-    # Save the file securely
-    f.save(path)
+    # Save the file, hashing it on the way for the result cache
+    h = hashlib.sha256()
+    with open(path, "wb") as out:
+        for chunk in iter(lambda: f.stream.read(1024 * 1024), b""):
+            h.update(chunk)
+            out.write(chunk)
+    with _upload_digests_lock:
+        _UPLOAD_DIGESTS[path] = h.hexdigest()
+        if len(_UPLOAD_DIGESTS) > _UPLOAD_DIGESTS_MAX:
+            _UPLOAD_DIGESTS.popitem(last=False)
+    JANITOR.track(path)
     return path
 
+# Backends load lazily on first use; DOCUMORPH_PRELOAD=1 (with gunicorn's
+# preload_app, see gunicorn.conf.py) loads them once in the master instead.
+if preload_enabled():
+    preload()
+STARTUP = {"app_import_s": round(time.perf_counter() - _import_started, 4),
+           "preload": preload_enabled(), "pid": os.getpid()}
+app.logger.info("DocuMorph app imported in %.3fs (preload=%s)", STARTUP["app_import_s"], STARTUP["preload"])
+
+def _cache_samples():
+    """Counters of the OCR page cache, which keeps them in its own index."""
+    stats = ocr_cache_stats()
+    if not stats:
+        return []
+    return [(f"documorph_cache_{name}", {"cache": "ocr"}, stats.get(key, 0))
+            for name, key in (("hits_total", "hits"), ("misses_total", "misses"),
+                              ("evictions_total", "evictions"), ("entries", "entries"), ("bytes", "bytes"))]
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint; totals cover every worker on this host."""
+    return Response(METRICS.render(_cache_samples()), mimetype="text/plain; version=0.0.4")
+
+@app.route("/admin/profile/<task_id>")
+def job_profile(task_id):
+    """
+    Profile of a profiled job: the text report, or with ?format=prof the raw
+    cProfile stats for pstats/snakeviz. Requires the admin token.
+    """
+    if not is_admin(request):
+        return jsonify({"error": "Admin token required."}), 403
+    prof_path, report_path = artifact_paths(os.path.basename(task_id))
+    if request.args.get("format") == "prof":
+        path, mimetype = prof_path, "application/octet-stream"
+    else:
+        path, mimetype = report_path, "text/plain"
+    if not os.path.isfile(path):
+        return jsonify({"error": "No profile for this task."}), 404
+    return send_from_directory(PROFILE_DIR, os.path.basename(path), mimetype=mimetype,
+                               as_attachment=mimetype != "text/plain")
+
+@app.route("/startup")
+def startup_timings():
+    """Import timings for this worker: the app itself and each backend loaded so far. Requires the admin token."""
+    if not is_admin(request):
+        return jsonify({"error": "Admin token required."}), 403
+    return jsonify(dict(STARTUP, backends=IMPORT_TIMES))
+
 @app.context_processor
 def inject_year():
     # This makes {{ current_year }} available in all templates
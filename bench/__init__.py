@@ -0,0 +1 @@
+# Benchmark suite for pdf_ops.tools: `python -m bench.run --help`
@@ -0,0 +1,179 @@
+# Deterministic benchmark corpus.
+#
+# Every document is generated from a fixed seed with PyMuPDF, Pillow and
+# python-docx, so two machines (or two commits) benchmark identical
+# inputs without shipping binary fixtures. Files are written once under
+# bench/corpus/ and reused until CORPUS_VERSION changes.
+import io
+import os
+import json
+import random
+from datetime import datetime
+
+from pdf_ops.tools import fitz, Image, docx
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CORPUS_VERSION = 2
+SEED = 1999
+
+WORDS = ("invoice revenue quarterly filing statement balance asset liability equity "
+         "report page section total amount margin growth forecast audit market "
+         "document customer contract period annual summary note value").split()
+
+
+def _sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def _paragraphs(rng: random.Random, count: int) -> str:
+    return "\n\n".join(" ".join(_sentence(rng) for _ in range(4)) for _ in range(count))
+
+
+def _save(doc, path: str) -> None:
+    # fixed metadata and no fresh /ID keep the bytes identical run to run
+    doc.set_metadata({"title": os.path.basename(path), "creator": "DocuMorph bench",
+                      "creationDate": "D:20240101000000", "modDate": "D:20240101000000"})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def _text_pdf(path: str, pages: int, rng: random.Random) -> None:
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Section {n}", fontsize=16)
+        page.insert_textbox(fitz.Rect(72, 80, 540, 770), _paragraphs(rng, 5), fontsize=10)
+    _save(doc, path)
+
+
+def _raster(rng: random.Random, w: int, h: int):
+    """Noisy gradient: compresses like a photo rather than like flat colour."""
+    noise = Image.frombytes("L", (w, h), rng.randbytes(w * h))
+    base = Image.linear_gradient("L").resize((w, h)).rotate(rng.randrange(360))
+    r = Image.blend(base, noise, 0.5)
+    return Image.merge("RGB", (r, noise, base))
+
+
+def _image_pdf(path: str, pages: int, rng: random.Random) -> None:
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        for i, rect in enumerate((fitz.Rect(50, 50, 300, 250), fitz.Rect(310, 50, 560, 250),
+                                  fitz.Rect(50, 300, 560, 700))):
+            img = _raster(rng, 800, 600)
+            buf = io.BytesIO()
+            img.save(buf, "JPEG" if i < 2 else "PNG", quality=90)
+            page.insert_image(rect, stream=buf.getvalue())
+        page.insert_text((50, 740), _sentence(rng), fontsize=10)
+    _save(doc, path)
+
+
+def _scanned_pdf(path: str, pages: int, rng: random.Random) -> None:
+    """Pages that are only a noisy grayscale picture of text, like a scanner produces."""
+    src = fitz.open()
+    for _ in range(pages):
+        page = src.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 770), _paragraphs(rng, 5), fontsize=11)
+    doc = fitz.open()
+    for page in src:
+        pix = page.get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        img = Image.blend(img, Image.frombytes("L", img.size, rng.randbytes(img.width * img.height)), 0.1)
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        out = doc.new_page(width=page.rect.width, height=page.rect.height)
+        out.insert_image(out.rect, stream=buf.getvalue())
+    src.close()
+    _save(doc, path)
+
+
+def _table_pdf(path: str, pages: int, rng: random.Random) -> None:
+    """Ruled tables on every other page, plain text on the rest."""
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        if n % 2:
+            page.insert_textbox(fitz.Rect(72, 72, 540, 770), _paragraphs(rng, 5), fontsize=10)
+            continue
+        rows, cols = 20, 5
+        x0, y0, cw, rh = 60, 80, 95, 22
+        shape = page.new_shape()
+        for r in range(rows + 1):
+            shape.draw_line((x0, y0 + r * rh), (x0 + cols * cw, y0 + r * rh))
+        for c in range(cols + 1):
+            shape.draw_line((x0 + c * cw, y0), (x0 + c * cw, y0 + rows * rh))
+        shape.finish(width=0.7)
+        shape.commit()
+        for r in range(rows):
+            for c in range(cols):
+                cell = rng.choice(WORDS) if c == 0 else f"{rng.uniform(0, 99999):.2f}"
+                page.insert_text((x0 + c * cw + 4, y0 + r * rh + 15), cell, fontsize=9)
+    _save(doc, path)
+
+
+def _docx(path: str, rng: random.Random) -> None:
+    d = docx.Document()
+    d.add_heading("Quarterly report", 0)
+    for _ in range(40):
+        d.add_paragraph(" ".join(_sentence(rng) for _ in range(4)))
+    table = d.add_table(rows=30, cols=4)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = f"{rng.uniform(0, 9999):.2f}"
+    d.core_properties.created = d.core_properties.modified = datetime(2024, 1, 1)
+    d.save(path)
+
+
+def _protected(src: str, path: str) -> None:
+    """
+    `src` encrypted by protect_pdf itself, so unlock_pdf has real decryption
+    work. PyPDF2 picks a fresh /ID, so only these bytes vary between builds.
+    """
+    from pdf_ops.tools import protect_pdf
+    os.replace(protect_pdf(src, "secret"), path)
+
+
+def _images(paths, rng: random.Random) -> None:
+    for p in paths:
+        img = _raster(rng, 1600, 1200)
+        img.save(p, "JPEG" if p.endswith(".jpg") else "PNG", quality=90)
+
+
+# name -> (builder, kwargs); each builder gets its own seeded Random
+DOCUMENTS = {
+    "text_1p.pdf": (_text_pdf, {"pages": 1}),
+    "text_1000p.pdf": (_text_pdf, {"pages": 1000}),
+    "images_20p.pdf": (_image_pdf, {"pages": 20}),
+    "scanned_10p.pdf": (_scanned_pdf, {"pages": 10}),
+    "tables_20p.pdf": (_table_pdf, {"pages": 20}),
+}
+IMAGES = ["photo_1.jpg", "photo_2.jpg", "photo_3.png", "photo_4.png"]
+
+
+def build(force: bool = False) -> dict:
+    """Generate the corpus if needed and return {name: path}."""
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    stamp = os.path.join(CORPUS_DIR, "VERSION")
+    names = list(DOCUMENTS) + ["protected_1000p.pdf", "report.docx"] + IMAGES
+    paths = {name: os.path.join(CORPUS_DIR, name) for name in names}
+    try:
+        with open(stamp) as f:
+            current = json.load(f) == {"version": CORPUS_VERSION, "seed": SEED}
+    except (OSError, ValueError):
+        current = False
+    if current and not force and all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    for i, (name, (builder, kwargs)) in enumerate(DOCUMENTS.items()):
+        builder(paths[name], rng=random.Random(SEED + i), **kwargs)
+    _protected(paths["text_1000p.pdf"], paths["protected_1000p.pdf"])
+    _docx(paths["report.docx"], random.Random(SEED + 100))
+    _images([paths[n] for n in IMAGES], random.Random(SEED + 200))
+    with open(stamp, "w") as f:
+        json.dump({"version": CORPUS_VERSION, "seed": SEED}, f)
+    return paths
+
+
+if __name__ == "__main__":
+    for name, path in build(force=True).items():
+        print(f"{os.path.getsize(path):>12,}  {name}")
@@ -0,0 +1,215 @@
+# Benchmark every pdf_ops tool against the deterministic corpus.
+#
+#   python -m bench.run                                   # run all cases, write bench/results/latest.json
+#   python -m bench.run --only text,ocr --repeat 5
+#   python -m bench.run --baseline bench/results/main.json --threshold 0.10
+#
+# Each run of a case happens in a fresh interpreter, so peak RSS belongs to
+# that tool alone (pool workers it starts are reported separately), and one
+# tool's caches or imports never flatter the next. With --baseline, a case
+# whose median wall time or peak RSS grew by more than --threshold fails the
+# run (exit status 1).
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import statistics
+import subprocess
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+
+
+def _case(func, *args, needs=(), **kwargs):
+    return {"func": func, "args": args, "kwargs": kwargs, "needs": needs}
+
+
+def cases(c: dict) -> dict:
+    """name -> tool call; `c` maps corpus file names to paths."""
+    text, big, images = c["text_1p.pdf"], c["text_1000p.pdf"], c["images_20p.pdf"]
+    scanned, tables = c["scanned_10p.pdf"], c["tables_20p.pdf"]
+    photos = [c[n] for n in ("photo_1.jpg", "photo_2.jpg", "photo_3.png", "photo_4.png")]
+    return {
+        "merge": _case("merge_pdfs", [text, images, tables, big]),
+        "split_every_100": _case("split_pdf", big, mode="every", value="100"),
+        "compress_native": _case("compress_pdf", images, quality="ebook"),
+        "compress_gs": _case("compress_pdf", images, quality="ebook", engine="gs", needs=("gs",)),
+        "protect": _case("protect_pdf", big, "secret"),
+        "unlock": _case("unlock_pdf", c["protected_1000p.pdf"], "secret"),
+        "rotate": _case("rotate_pdf", big, 90),
+        "reorder": _case("reorder_pages", big, list(range(1000, 0, -1))),
+        "watermark_text": _case("watermark_pdf", big, text="CONFIDENTIAL", opacity=0.3),
+        "sign_all_pages": _case("sign_pdf_with_image", big, photos[2], pages="all"),
+        "extract_text": _case("extract_text", big),
+        "extract_text_parallel": _case("extract_text", big, parallel=True),
+        "extract_text_json": _case("extract_text", big, fmt="json"),
+        "pdf_to_docx_1p": _case("pdf_to_docx", text),
+        "pdf_to_docx_tables": _case("pdf_to_docx", tables),
+        "pdf_to_images_150dpi": _case("pdf_to_images", images, dpi=150),
+        "images_to_pdf": _case("images_to_pdf", photos),
+        "office_to_pdf": _case("office_to_pdf", c["report.docx"], needs=("soffice",)),
+        "extract_images": _case("extract_images", images),
+        "pdf_to_excel": _case("pdf_to_excel", tables, needs=("camelot",)),
+        "pdf_to_html_images": _case("pdf_to_html", images),
+        "pdf_to_html_1000p": _case("pdf_to_html", big),
+        "ocr": _case("pdf_ocr", scanned, use_cache=False, needs=("tesseract", "pytesseract")),
+    }
+
+
+def missing(needs) -> list:
+    """Binaries/modules a case needs that this machine lacks."""
+    from pdf_ops.tools import has_binary
+    return [n for n in needs if not has_binary(n) and importlib.util.find_spec(n) is None]
+
+
+def _pages(args) -> int:
+    """Pages processed: page counts of the input PDFs, 1 per other input file."""
+    from pdf_ops.tools import fitz
+    first = args[0]
+    total = 0
+    for p in first if isinstance(first, list) else [first]:
+        if p.endswith(".pdf"):
+            with fitz.open(p) as doc:
+                total += doc.page_count
+        else:
+            total += 1
+    return total
+
+
+def run_child(name: str) -> dict:
+    """Run one case in this (fresh) process and measure it."""
+    from bench.corpus import build
+    from pdf_ops import tools
+    case = cases(build())[name]
+    pages = _pages(case["args"])
+    before = set(os.listdir(tools.OUTPUTS))
+    start = time.perf_counter()
+    getattr(tools, case["func"])(*case["args"], **case["kwargs"])
+    wall = time.perf_counter() - start
+    output_bytes = 0
+    for fn in set(os.listdir(tools.OUTPUTS)) - before:
+        path = os.path.join(tools.OUTPUTS, fn)
+        output_bytes += os.path.getsize(path)
+        os.remove(path)
+    kb = 1 if sys.platform != "darwin" else 1024  # ru_maxrss is KiB on Linux, bytes on macOS
+    return {
+        "wall_s": round(wall, 4),
+        "pages": pages,
+        "pages_per_s": round(pages / wall, 2) if wall else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / kb / 1024, 1),
+        "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / kb / 1024, 1),
+        "output_bytes": output_bytes,
+    }
+
+
+def run_case(name: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        res = subprocess.run([sys.executable, "-m", "bench.run", "--child", name],
+                             cwd=ROOT, capture_output=True, text=True)
+        if res.returncode != 0:
+            return {"error": (res.stderr.strip().splitlines() or ["failed"])[-1]}
+        runs.append(json.loads(res.stdout.strip().splitlines()[-1]))
+    wall = statistics.median(r["wall_s"] for r in runs)
+    return {
+        "wall_s": round(wall, 4),
+        "wall_runs": [r["wall_s"] for r in runs],
+        "pages": runs[0]["pages"],
+        "pages_per_s": round(runs[0]["pages"] / wall, 2) if wall else None,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "peak_child_rss_mb": max(r["peak_child_rss_mb"] for r in runs),
+        "output_bytes": runs[-1]["output_bytes"],
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list:
+    """
+    Regressions against `baseline`: wall time or peak RSS up by more than
+    `threshold` (a fraction). Wall-time changes under `min_delta` seconds are
+    ignored as timer noise.
+    """
+    regressions = []
+    for name, cur in results["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if not old or "wall_s" not in cur or "wall_s" not in old:
+            continue
+        for metric, floor in (("wall_s", min_delta), ("peak_rss_mb", 0)):
+            if old[metric] and cur[metric] > old[metric] * (1 + threshold) and cur[metric] - old[metric] > floor:
+                regressions.append(f"{name}: {metric} {old[metric]} -> {cur[metric]} "
+                                   f"(+{(cur[metric] / old[metric] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run", description="Benchmark pdf_ops tools.")
+    ap.add_argument("--only", help="comma-separated substrings of case names to run")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case; the median wall time is kept")
+    ap.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    ap.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown/growth, e.g. 0.10 = 10%%")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="ignore wall-time changes below this (s)")
+    ap.add_argument("--rebuild-corpus", action="store_true")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child)))
+        return 0
+
+    from bench.corpus import build
+    all_cases = cases(build(force=args.rebuild_corpus))
+    names = list(all_cases)
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",") if w.strip()]
+        names = [n for n in names if any(w in n for w in wanted)]
+
+    results = {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "repeat": args.repeat, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "cases": {},
+    }
+    print(f"{'case':<24}{'wall s':>9}{'pages/s':>10}{'rss MB':>9}{'child MB':>10}{'output':>14}")
+    for name in names:
+        lacking = missing(all_cases[name]["needs"])
+        r = {"skipped": "missing " + ", ".join(lacking)} if lacking else run_case(name, args.repeat)
+        results["cases"][name] = r
+        if "wall_s" in r:
+            print(f"{name:<24}{r['wall_s']:>9.3f}{r['pages_per_s'] or 0:>10.1f}{r['peak_rss_mb']:>9.1f}"
+                  f"{r['peak_child_rss_mb']:>10.1f}{r['output_bytes']:>14,}")
+        else:
+            print(f"{name:<24}  {r.get('skipped') or 'ERROR: ' + r['error']}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nno regressions over {args.threshold:.0%} against {args.baseline}")
+    errors = [n for n, r in results["cases"].items() if "error" in r]
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
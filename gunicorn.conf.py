@@ -0,0 +1,12 @@
+import os
+
+# DOCUMORPH_PRELOAD=1: import the app -- and with it every PDF backend -- once
+# in the master, so forked workers share those pages instead of each paying
+# the import on its first request.
+preload_app = os.environ.get("DOCUMORPH_PRELOAD", "0") == "1"
+
+
+def on_starting(server):
+    # runs in the master before any worker forks: the job executors divide
+    # the host's cores between the workers (see JobExecutor in jobs.py)
+    os.environ.setdefault("DOCUMORPH_WEB_WORKERS", str(server.cfg.workers))
@@ -0,0 +1,173 @@
+import os
+import time
+import fcntl
+import logging
+import threading
+from typing import Iterable
+
+from pdf_ops.cache import LocalConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+FILE_TTL = int(os.environ.get("DOCUMORPH_FILE_TTL", "3600"))                  # seconds an upload/output is kept
+DISK_QUOTA = int(os.environ.get("DOCUMORPH_DISK_QUOTA_MB", "2048")) * 1024 * 1024
+SWEEP_INTERVAL = int(os.environ.get("DOCUMORPH_JANITOR_INTERVAL", "60"))
+ORPHAN_SWEEP_INTERVAL = int(os.environ.get("DOCUMORPH_JANITOR_ORPHAN_SWEEP", "21600"))
+PIN_MAX_AGE = 6 * 3600  # pins left behind by a crashed worker stop protecting files after this
+
+log = logging.getLogger(__name__)
+
+
+class Janitor:
+    """
+    Expiry index for uploads/ and outputs/, shared by every worker.
+
+    Files are registered when they are created, with an expiry time, so a
+    sweep is one indexed query instead of listdir + getmtime over both
+    folders. Files used by a running task are pinned and never deleted,
+    neither by expiry nor by the disk quota, which evicts the oldest
+    unpinned files first. Every worker runs a janitor thread, but only the
+    one holding janitor.lock actually sweeps.
+    """
+    def __init__(self, folders: Iterable[str], path: str = None, ttl: int = FILE_TTL,
+                 quota: int = DISK_QUOTA):
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.path = path or os.environ.get("DOCUMORPH_JANITOR_DB", os.path.join(BASE_DIR, "janitor.db"))
+        self.ttl = ttl
+        self.quota = quota
+        self._conn = LocalConnection(self.path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS files_expires ON files (expires)")
+        conn.execute("CREATE INDEX IF NOT EXISTS files_created ON files (created)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pins ("
+            " owner TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS pins_path ON pins (path)")
+        conn.execute("CREATE INDEX IF NOT EXISTS pins_owner ON pins (owner)")
+
+    # --- registration (called from request/job code) ---
+
+    def track(self, paths) -> None:
+        """Register new files (a path or a list of paths) for expiry."""
+        if isinstance(paths, str):
+            paths = [paths]
+        now = time.time()
+        rows = []
+        for p in paths:
+            p = os.path.abspath(p)
+            try:
+                rows.append((p, os.path.getsize(p), now, now + self.ttl))
+            except OSError:
+                continue
+        if rows:
+            self._conn().executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", rows)
+
+    def pin(self, owner: str, paths) -> None:
+        """Protect `paths` while `owner` (a task id) is using them."""
+        now = time.time()
+        self._conn().executemany("INSERT INTO pins VALUES (?, ?, ?)",
+                                 [(owner, os.path.abspath(p), now) for p in paths])
+
+    def unpin(self, owner: str) -> None:
+        self._conn().execute("DELETE FROM pins WHERE owner = ?", (owner,))
+
+    # --- sweeping (leader only) ---
+
+    def _remove(self, conn, path: str) -> int:
+        conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            log.warning("janitor: could not remove %s: %s", path, e)
+            return 0
+
+    def sweep(self) -> dict:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("DELETE FROM pins WHERE created < ?", (now - PIN_MAX_AGE,))
+        unpinned = "path NOT IN (SELECT path FROM pins)"
+        expired = [r[0] for r in conn.execute(
+            f"SELECT path FROM files WHERE expires < ? AND {unpinned}", (now,))]
+        freed = sum(self._remove(conn, p) for p in expired)
+
+        evicted = 0
+        used = conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+        if used > self.quota:
+            for path, size in conn.execute(
+                    f"SELECT path, size FROM files WHERE {unpinned} ORDER BY created").fetchall():
+                if used <= self.quota:
+                    break
+                freed += self._remove(conn, path)
+                used -= size
+                evicted += 1
+        return {"expired": len(expired), "evicted": evicted, "freed": freed, "used": used}
+
+    def sweep_orphans(self) -> int:
+        """
+        Safety net for files nothing registered (e.g. tool side files): expire
+        anything in the folders that is unknown to the index and older than ttl.
+        """
+        conn = self._conn()
+        now = time.time()
+        removed = 0
+        for folder in self.folders:
+            for entry in os.scandir(folder):
+                if not entry.is_file():
+                    continue
+                path = os.path.abspath(entry.path)
+                if conn.execute("SELECT 1 FROM files WHERE path = ? UNION ALL "
+                                "SELECT 1 FROM pins WHERE path = ?", (path, path)).fetchone():
+                    continue
+                if now - entry.stat().st_mtime > self.ttl:
+                    self._remove(conn, path)
+                    removed += 1
+        return removed
+
+    def run(self) -> None:
+        """Janitor thread body: sweep while holding the cross-process leader lock."""
+        lock_file = open(self.path + ".lock", "a")
+        last_orphan_sweep = 0.0
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                time.sleep(SWEEP_INTERVAL)  # another worker is the janitor
+                continue
+            try:
+                self.sweep()
+                if time.time() - last_orphan_sweep > ORPHAN_SWEEP_INTERVAL:
+                    last_orphan_sweep = time.time()
+                    self.sweep_orphans()
+            except Exception:
+                log.exception("janitor sweep failed")
+            time.sleep(SWEEP_INTERVAL)
+
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+def get_janitor(folders) -> Janitor:
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = Janitor(folders)
+    return _janitor
+
+def start_janitor(folders) -> Janitor:
+    janitor = get_janitor(folders)
+    threading.Thread(target=janitor.run, name="janitor", daemon=True).start()
+    return janitor
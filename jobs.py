@@ -0,0 +1,269 @@
+import os
+import time
+import inspect
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdf_ops.backends import BACKENDS, preload_enabled
+from pdf_ops.tools import core_tokens, cpu_share
+
+# Tools that spend their time waiting on an external binary (LibreOffice)
+# rather than on the CPU of this process; they go to the thread lane.
+SUBPROCESS_TOOLS = {"office_to_pdf"}
+# Tools that only shell out with some values of their `engine` argument.
+SUBPROCESS_ENGINES = {"compress_pdf": {"gs"}}
+
+log = logging.getLogger(__name__)
+
+
+def _init_job_worker(core_tokens):
+    from pdf_ops.tools import set_core_tokens
+    set_core_tokens(core_tokens)
+
+
+def _run_on_core(func, *args, **kwargs):
+    # a process-lane job occupies one core token while it runs; page work
+    # inside it fans out onto whatever tokens are idle (see pdf_ops.tools)
+    from pdf_ops.tools import hold_core
+    with hold_core():
+        return func(*args, **kwargs)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class QueueFull(Exception):
+    """Raised by JobExecutor.submit when a lane has no room left."""
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, please retry shortly.")
+        self.retry_after = retry_after
+
+
+class ProgressReporter:
+    """
+    Progress callback handed to tools as `progress=`. It is pickled into pool
+    processes and writes straight to the shared task store, only when the
+    percentage actually changes, together with an ETA from the observed rate.
+    """
+    def __init__(self, task_id: str, store=None):
+        self.task_id = task_id
+        self.started = time.time()
+        self._store = store
+        self._last = -1
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_store"] = None
+        return state
+
+    def __call__(self, done: int, total: int):
+        pct = min(99, int(done * 100 / total))  # 100 is set once the output is ready
+        if pct == self._last:
+            return
+        self._last = pct
+        if self._store is None:
+            from task_store import get_task_store
+            self._store = get_task_store()
+        elapsed = time.time() - self.started
+        eta = round(elapsed / done * (total - done), 1) if done else None
+        self._store.update(self.task_id, progress=pct, eta=eta)
+
+
+def accepts_progress(func) -> bool:
+    try:
+        return "progress" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class _Lane:
+    """
+    A pool plus the FIFO of jobs waiting for one of its slots.
+
+    Jobs are only handed to the pool when a slot is free, so the pool's own
+    queue stays empty and we always know which jobs are running and where
+    every waiting job stands.
+    """
+    def __init__(self, name, make_pool, slots, max_queue, store, finisher, runner=None):
+        self.name = name
+        self._runner = runner
+        self.slots = slots
+        self.max_queue = max_queue
+        self._make_pool = make_pool
+        self._pool = None
+        self._store = store
+        self._finisher = finisher
+        self._pending = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def submit(self, job) -> int:
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                return 0
+            position = len(self._pending) + 1
+            self._store.create(job["task_id"], status="queued", progress=0, position=position,
+                               output=None, error=None, queued_at=time.time())
+            self._pending.append(job)
+        self._pump()
+        return position
+
+    def _pump(self):
+        started = []
+        with self._lock:
+            while self._running < self.slots and self._pending:
+                job = self._pending.popleft()
+                self._running += 1
+                started.append(job)
+            waiting = [j["task_id"] for j in self._pending]
+        for job in started:
+            try:
+                self._start(job)
+            except Exception as e:
+                # the job never reached the pool; finish it as failed so its slot is freed
+                failed = Future()
+                failed.set_exception(e)
+                self._finisher.submit(self._done, job, None, failed)
+        if started:
+            for i, task_id in enumerate(waiting, start=1):
+                self._store.update(task_id, position=i)
+
+    def _start(self, job):
+        self._store.update(job["task_id"], status="running", position=0, started_at=time.time())
+        if job["on_start"] is not None:
+            job["on_start"](job["task_id"])
+        if accepts_progress(job["func"]) and "progress" not in job["kwargs"]:
+            job["kwargs"]["progress"] = ProgressReporter(job["task_id"], self._store)
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._make_pool()
+            pool = self._pool
+            call = (self._runner, job["func"]) if self._runner else (job["func"],)
+            try:
+                future = pool.submit(*call, *job["args"], **job["kwargs"])
+            except BrokenProcessPool:
+                # a worker died (OOM, segfault in a native lib); start a fresh pool
+                pool.shutdown(wait=False)
+                pool = self._pool = self._make_pool()
+                future = pool.submit(*call, *job["args"], **job["kwargs"])
+        future.add_done_callback(lambda f, job=job, pool=pool: self._finisher.submit(self._done, job, pool, f))
+
+    def _done(self, job, pool, future):
+        try:
+            if job["on_done"] is not None:
+                job["on_done"](job["task_id"], future)
+        except Exception as e:
+            # never leave the task "running" because its bookkeeping failed
+            log.exception("on_done failed for task %s", job["task_id"])
+            self._store.update(job["task_id"], status="error", progress=-1, error=str(e))
+        finally:
+            if pool is not None and isinstance(future.exception(), BrokenProcessPool):
+                with self._pool_lock:
+                    # another job may already have replaced the broken pool
+                    if self._pool is pool:
+                        self._pool = None
+                pool.shutdown(wait=False)
+            with self._lock:
+                self._running -= 1
+            self._pump()
+
+
+class JobExecutor:
+    """
+    Bounded executor for AJAX tool jobs.
+
+    CPU-bound tools run in a process pool so they can use every core without
+    fighting over the GIL; tools that shell out run in a thread pool. Each lane
+    accepts at most `max_queue` waiting jobs; beyond that `submit` raises
+    QueueFull so the request can be answered with Retry-After instead of
+    piling more work onto a saturated node.
+
+    Every gunicorn worker has its own executor, so these limits are per
+    worker, not per host; the host runs up to DOCUMORPH_WEB_WORKERS times as
+    many jobs and queues as many more. The process pool defaults to this
+    worker's share of the cores so the workers together fill the host once.
+
+    Configuration (per gunicorn worker):
+    DOCUMORPH_WEB_WORKERS      gunicorn workers on this host (set by gunicorn.conf.py, default: 1)
+    DOCUMORPH_PROCESS_WORKERS  size of the process pool (default: CPU count // web workers)
+    DOCUMORPH_PARALLEL_MIN_PAGES  pages below which cheap page work isn't fanned out (default: 64)
+    DOCUMORPH_THREAD_WORKERS   size of the thread pool (default: 4)
+    DOCUMORPH_MAX_QUEUE        waiting jobs allowed per lane (default: 16)
+    DOCUMORPH_RETRY_AFTER      seconds suggested to rejected clients (default: 15)
+    DOCUMORPH_MP_START         multiprocessing start method (default: forkserver)
+
+    A running process-lane job holds one of the worker's core tokens (see
+    pdf_ops.tools.core_tokens); page-parallel tools fan out onto the tokens
+    that are idle, so a lone OCR job uses every core and a full lane doesn't
+    start a single extra process.
+    """
+    def __init__(self, store, process_workers=None, thread_workers=None,
+                 max_queue=None, retry_after=None):
+        self.store = store
+        self.process_workers = process_workers or _env_int("DOCUMORPH_PROCESS_WORKERS", cpu_share())
+        self.thread_workers = thread_workers or _env_int("DOCUMORPH_THREAD_WORKERS", 4)
+        self.max_queue = max_queue if max_queue is not None else _env_int("DOCUMORPH_MAX_QUEUE", 16)
+        self.retry_after = retry_after or _env_int("DOCUMORPH_RETRY_AFTER", 15)
+        self._finisher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="job-finish")
+        self._lanes = {
+            "process": _Lane("process", self._make_process_pool, self.process_workers,
+                             self.max_queue, store, self._finisher, runner=_run_on_core),
+            "thread": _Lane("thread", self._make_thread_pool, self.thread_workers,
+                            self.max_queue, store, self._finisher),
+        }
+
+    def _make_process_pool(self):
+        method = os.environ.get("DOCUMORPH_MP_START", "forkserver")
+        ctx = multiprocessing.get_context(method)
+        if method == "forkserver" and preload_enabled():
+            # pool processes fork from a server that already imported the backends
+            ctx.set_forkserver_preload(["pdf_ops.tools"] + BACKENDS)
+        return ProcessPoolExecutor(max_workers=self.process_workers, mp_context=ctx,
+                                   initializer=_init_job_worker, initargs=(core_tokens(),))
+
+    def _make_thread_pool(self):
+        return ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="job")
+
+    def lane_for(self, func, kwargs=None) -> str:
+        # pool processes can only report progress through a store they can open themselves
+        if not self.store.shared:
+            return "thread"
+        name = getattr(func, "__name__", "")
+        if name in SUBPROCESS_TOOLS or (kwargs or {}).get("engine") in SUBPROCESS_ENGINES.get(name, ()):
+            return "thread"
+        return "process"
+
+    def submit(self, task_id, func, args=(), kwargs=None, on_done=None, on_start=None) -> int:
+        """
+        Queue func(*args, **kwargs) for task_id and return its position in the
+        lane's queue at admission (1 = next to run). on_start(task_id) runs
+        when the job leaves the queue for a pool slot, on_done(task_id, future)
+        in the web worker when it finishes. Raises QueueFull when the lane is
+        full.
+        """
+        job = {"task_id": task_id, "func": func, "args": tuple(args), "kwargs": dict(kwargs or {}),
+               "on_done": on_done, "on_start": on_start}
+        position = self._lanes[self.lane_for(func, job["kwargs"])].submit(job)
+        if not position:
+            raise QueueFull(self.retry_after)
+        return position
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(store) -> JobExecutor:
+    """Create the executor lazily so no pool exists before gunicorn forks."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor(store)
+    return _executor
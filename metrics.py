@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from pdf_ops.cache import LocalConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+log = logging.getLogger(__name__)
+
+# seconds; tools range from sub-second page ops to multi-minute OCR
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HELP = {
+    "documorph_requests_total": ("counter", "Tool requests by tool and path (async/sync)."),
+    "documorph_result_cache_hits_total": ("counter", "Requests answered from the result cache."),
+    "documorph_rejected_total": ("counter", "Async requests refused because the job queue was full."),
+    "documorph_failures_total": ("counter", "Failed tool runs by exception type."),
+    "documorph_input_bytes_total": ("counter", "Bytes of uploaded input processed."),
+    "documorph_output_bytes_total": ("counter", "Bytes of output produced."),
+    "documorph_pages_total": ("counter", "PDF pages processed."),
+    "documorph_queue_wait_seconds": ("histogram", "Time async jobs waited for an executor slot."),
+    "documorph_run_seconds": ("histogram", "Time tools spent running."),
+    "documorph_active_jobs": ("gauge", "Jobs currently queued or running."),
+    "documorph_cache_hits_total": ("counter", "Disk cache lookups answered from the cache."),
+    "documorph_cache_misses_total": ("counter", "Disk cache lookups that missed."),
+    "documorph_cache_evictions_total": ("counter", "Disk cache entries evicted to stay under the size cap."),
+    "documorph_cache_entries": ("gauge", "Entries currently held in a disk cache."),
+    "documorph_cache_bytes": ("gauge", "Bytes currently held in a disk cache."),
+}
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    """Canonical Prometheus label string, also used as the storage key."""
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{k}="{esc(v)}"' for k, v in sorted(labels.items()))
+
+
+def _fmt(value: float) -> str:
+    # exact integers for byte/page counters, which %g would round
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class Metrics:
+    """
+    Prometheus metrics kept in a SQLite file, so every gunicorn worker adds to
+    the same counters and /metrics on any worker reports host-wide totals.
+
+    Counters and histogram buckets are plain UPSERTed rows. Gauges are stored
+    per process and summed at scrape time, skipping rows of processes that
+    no longer exist, so a crashed worker can't leave jobs "active" forever.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("DOCUMORPH_METRICS_DB", os.path.join(BASE_DIR, "metrics.db"))
+        self._conn = LocalConnection(self.path)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " name TEXT NOT NULL,"
+            " labels TEXT NOT NULL,"
+            " value REAL NOT NULL,"
+            " PRIMARY KEY (name, labels))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS gauges ("
+            " name TEXT NOT NULL,"
+            " labels TEXT NOT NULL,"
+            " pid INTEGER NOT NULL,"
+            " value REAL NOT NULL,"
+            " PRIMARY KEY (name, labels, pid))"
+        )
+
+    # writes are best-effort: a busy metrics file must never fail a request or a job
+
+    def _add(self, rows: Iterable[tuple]) -> None:
+        try:
+            self._conn().executemany(
+                "INSERT INTO samples VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value", rows)
+        except sqlite3.Error as e:
+            log.warning("metrics write failed: %s", e)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if value:
+            self._add([(name, _labels(labels), value)])
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        le = next((str(b) for b in LATENCY_BUCKETS if value <= b), "+Inf")
+        self._add([(f"{name}_bucket", f'{key},le="{le}"' if key else f'le="{le}"', 1),
+                   (f"{name}_sum", key, value), (f"{name}_count", key, 1)])
+
+    def gauge_add(self, name: str, delta: float, **labels) -> None:
+        try:
+            self._conn().execute(
+                "INSERT INTO gauges VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, labels, pid) DO UPDATE SET value = value + excluded.value",
+                (name, _labels(labels), os.getpid(), delta))
+        except sqlite3.Error as e:
+            log.warning("metrics write failed: %s", e)
+
+    def render(self, snapshot: Iterable[tuple] = ()) -> str:
+        """
+        All metrics in the Prometheus text exposition format. `snapshot` adds
+        (name, labels, value) samples read at scrape time from state kept
+        elsewhere, such as the disk caches' own counters.
+        """
+        conn = self._conn()
+        for (pid,) in conn.execute("SELECT DISTINCT pid FROM gauges").fetchall():
+            if not _pid_alive(pid):
+                conn.execute("DELETE FROM gauges WHERE pid = ?", (pid,))
+        series = {}
+        for name, labels, value in conn.execute("SELECT name, labels, value FROM samples"):
+            series.setdefault(name, []).append((labels, value))
+        for name, labels, value in conn.execute(
+                "SELECT name, labels, SUM(value) FROM gauges GROUP BY name, labels"):
+            series.setdefault(name, []).append((labels, value))
+        for name, labels, value in snapshot:
+            series.setdefault(name, []).append((_labels(labels), value))
+
+        lines = []
+        for metric, (kind, text) in HELP.items():
+            lines.append(f"# HELP {metric} {text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            if kind == "histogram":
+                lines.extend(self._histogram(metric, series))
+            else:
+                for labels, value in sorted(series.get(metric, [])):
+                    lines.append(f"{metric}{{{labels}}} {_fmt(value)}" if labels else f"{metric} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram(metric: str, series: dict) -> list:
+        # buckets are stored per slot; Prometheus wants them cumulative
+        bounds = [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+        per_series = {}
+        for labels, value in series.get(f"{metric}_bucket", []):
+            key, _, le = labels.rpartition("le=")
+            per_series.setdefault(key.rstrip(","), {})[le.strip('"')] = value
+        lines = []
+        for key in sorted(per_series):
+            total = 0
+            for le in bounds:
+                total += per_series[key].get(le, 0)
+                sep = "," if key else ""
+                lines.append(f'{metric}_bucket{{{key}{sep}le="{le}"}} {_fmt(total)}')
+            for suffix in ("_sum", "_count"):
+                value = dict(series.get(metric + suffix, [])).get(key, 0)
+                lines.append(f"{metric}{suffix}{{{key}}} {_fmt(value)}" if key else f"{metric}{suffix} {_fmt(value)}")
+        return lines
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics() -> Metrics:
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import json
+import importlib
+import subprocess
+import threading
+
+# Heavy third-party backends used by pdf_ops.tools, imported on first use.
+BACKENDS = ["fitz", "PyPDF2", "PIL.Image", "docx", "pdf2docx", "openpyxl", "camelot", "pytesseract"]
+
+# module name -> seconds its first import took in this process
+IMPORT_TIMES = {}
+_lock = threading.Lock()
+
+
+def preload_enabled() -> bool:
+    return os.environ.get("DOCUMORPH_PRELOAD", "0") == "1"
+
+
+def load(name: str):
+    """Import `name` (timed, once per process) and return the module."""
+    mod = sys.modules.get(name)
+    if mod is not None and name in IMPORT_TIMES:
+        return mod
+    with _lock:
+        start = time.perf_counter()
+        mod = importlib.import_module(name)
+        IMPORT_TIMES.setdefault(name, round(time.perf_counter() - start, 4))
+    return mod
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access."""
+    def __init__(self, name: str):
+        self._name = name
+        self._mod = None
+
+    def __getattr__(self, attr):
+        if self._mod is None:
+            self._mod = load(self._name)
+        return getattr(self._mod, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._mod is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def preload(names=None) -> dict:
+    """
+    Import backends now. Run in the gunicorn master (preload_app) so forked
+    workers share the already-initialised pages copy-on-write. Backends that
+    are not installed are skipped.
+    """
+    for name in names or BACKENDS:
+        try:
+            load(name)
+        except ImportError:
+            pass
+    return dict(IMPORT_TIMES)
+
+
+def startup_report() -> dict:
+    """
+    Cold import time of each backend and of the app itself, each measured in
+    a fresh interpreter so results don't depend on import order.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe = ("import time, importlib; t = time.perf_counter(); importlib.import_module({!r}); "
+             "print(time.perf_counter() - t)")
+    report = {}
+    for name in BACKENDS + ["app"]:
+        res = subprocess.run([sys.executable, "-c", probe.format(name)], cwd=root,
+                             capture_output=True, text=True)
+        report[name] = round(float(res.stdout.strip().splitlines()[-1]), 4) if res.returncode == 0 else None
+    return report
+
+
+if __name__ == "__main__":
+    # python -m pdf_ops.backends  -> JSON cold-start timings (null = not installed / failed)
+    print(json.dumps(startup_report(), indent=2))
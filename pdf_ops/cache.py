@@ -0,0 +1,166 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+
+def hash_key(*parts) -> str:
+    """sha256 over a sequence of bytes/str parts, unambiguously separated."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def copy_file(src: str, dst: str) -> None:
+    """
+    Copy `src` to `dst` through a temp file and os.replace, so `dst` is always
+    a new inode. Never hard-link: outputs/ names get reused by later runs, and
+    a shared inode would let one run rewrite another run's cached result.
+    """
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class LocalConnection:
+    """
+    Callable returning this thread's connection to the SQLite file at `path`,
+    in WAL mode so readers never block on the one writer. Each thread gets
+    its own connection, and one inherited across fork() is never reused.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class DiskCache:
+    """
+    Persistent blob cache shared by every process on the host.
+
+    Blobs live as files under `root`; a SQLite index next to them records
+    size and last use, so LRU eviction and the size limit never need a
+    directory scan. Hit/miss counters are kept in the same index so they
+    add up across gunicorn workers and pool processes.
+    """
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._conn = LocalConnection(os.path.join(root, "index.db"))
+        os.makedirs(root, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _count(self, name: str, n: int = 1):
+        self._conn().execute("UPDATE stats SET value = value + ? WHERE name = ?", (n, name))
+
+    def get(self, key: str) -> Optional[bytes]:
+        fn = self.get_path(key)
+        if fn is None:
+            return None
+        try:
+            with open(fn, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_path(self, key: str, count: bool = True) -> Optional[str]:
+        """Path of the cached blob (marking it recently used), or None."""
+        conn = self._conn()
+        row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        fn = self._file(key)
+        if row is not None:
+            if os.path.isfile(fn):
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                if count:
+                    self._count("hits")
+                return fn
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if count:
+            self._count("misses")
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        fn = self._file(key)
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        tmp = f"{fn}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, fn)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._index(key, len(data))
+
+    def put_file(self, key: str, src: str) -> None:
+        """Store a private copy of `src`."""
+        size = os.path.getsize(src)
+        if size > self.max_bytes:
+            return
+        fn = self._file(key)
+        os.makedirs(os.path.dirname(fn), exist_ok=True)
+        copy_file(src, fn)
+        self._index(key, size)
+
+    def _index(self, key: str, size: int):
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, size, time.time()))
+        self._evict()
+
+    def _evict(self):
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # trim to 90% so we don't evict again on the very next put
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        stats = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        stats.update(entries=entries, bytes=size, max_bytes=self.max_bytes)
+        return stats
@@ -0,0 +1,186 @@
+# Warm pool of headless LibreOffice instances for Office -> PDF conversion.
+#
+# Each instance runs with its own user profile and listens on a private UNO
+# pipe, so conversions skip the multi-second soffice start-up and concurrent
+# jobs never share a profile. Requires the `uno` Python bindings that ship
+# with LibreOffice (python3-uno), importable from the interpreter the app runs
+# on: distro packages only build them for the distro's python3, which is why
+# the Dockerfile runs the app on it. Without them office_to_pdf falls back to
+# one cold soffice process per job.
+import os
+import time
+import logging
+import queue
+import atexit
+import shutil
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+POOL_SIZE = int(os.environ.get("DOCUMORPH_OFFICE_POOL", "2"))          # 0 disables the pool
+MAX_JOBS = int(os.environ.get("DOCUMORPH_OFFICE_MAX_JOBS", "50"))      # recycle an instance after N jobs
+JOB_TIMEOUT = int(os.environ.get("DOCUMORPH_OFFICE_TIMEOUT", "120"))   # seconds per conversion
+START_TIMEOUT = 30
+
+log = logging.getLogger(__name__)
+
+PDF_FILTERS = {
+    "doc": "writer_pdf_Export", "docx": "writer_pdf_Export",
+    "xls": "calc_pdf_Export", "xlsx": "calc_pdf_Export",
+    "ppt": "impress_pdf_Export", "pptx": "impress_pdf_Export",
+}
+
+
+def uno_available() -> bool:
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _props(**kwargs):
+    from com.sun.star.beans import PropertyValue
+    props = []
+    for name, value in kwargs.items():
+        p = PropertyValue()
+        p.Name, p.Value = name, value
+        props.append(p)
+    return tuple(props)
+
+
+class _OfficeInstance:
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs = 0
+        self.profile = tempfile.mkdtemp(prefix=f"{name}_profile_")
+        self.proc = subprocess.Popen(
+            ["soffice", "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+             f"-env:UserInstallation={Path(self.profile).as_uri()}",
+             f"--accept=pipe,name={name};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        self.desktop = self._connect()
+
+    def _connect(self):
+        import uno
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.time() + START_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={self.name};urp;StarOffice.ComponentContext")
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if self.proc.poll() is not None or time.time() > deadline:
+                    self.kill()
+                    raise RuntimeError("LibreOffice instance failed to start.")
+                time.sleep(0.25)
+
+    def healthy(self) -> bool:
+        if self.proc.poll() is not None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def convert(self, src: str, dst: str, timeout: int):
+        import uno
+        ext = src.rsplit(".", 1)[-1].lower()
+        # a hung import can only be interrupted by killing the instance
+        timer = threading.Timer(timeout, self.kill)
+        timer.start()
+        try:
+            doc = self.desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(src)), "_blank", 0,
+                _props(Hidden=True, ReadOnly=True))
+            if doc is None:
+                raise RuntimeError("Conversion failed (LibreOffice could not open the file).")
+            try:
+                doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(dst)),
+                               _props(FilterName=PDF_FILTERS.get(ext, "writer_pdf_Export")))
+            finally:
+                doc.close(True)
+        except Exception:
+            if not timer.is_alive():
+                raise TimeoutError(f"Conversion timed out after {timeout}s.")
+            raise
+        finally:
+            timer.cancel()
+            self.jobs += 1
+
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+
+class OfficePool:
+    """
+    Fixed set of warm instances handed out one job at a time. An instance is
+    health-checked before each job, replaced if it died or timed out, and
+    recycled after `max_jobs` conversions to cap LibreOffice's memory creep.
+    """
+    def __init__(self, size: int = POOL_SIZE, max_jobs: int = MAX_JOBS, timeout: int = JOB_TIMEOUT):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        for i in range(size):
+            self._idle.put(f"documorph_{os.getpid()}_{i}")  # started lazily
+
+    def _instance(self, slot):
+        if isinstance(slot, _OfficeInstance):
+            if slot.jobs < self.max_jobs and slot.healthy():
+                return slot
+            slot.kill()
+            with self._lock:
+                if slot in self._all:
+                    self._all.remove(slot)
+            slot = slot.name
+        inst = _OfficeInstance(slot)
+        with self._lock:
+            self._all.append(inst)
+        return inst
+
+    def convert(self, src: str, dst: str, timeout: Optional[int] = None):
+        slot = self._idle.get()
+        try:
+            slot = self._instance(slot)
+            slot.convert(src, dst, timeout or self.timeout)
+        finally:
+            self._idle.put(slot)
+
+    def close(self):
+        with self._lock:
+            for inst in self._all:
+                inst.kill()
+            self._all = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_warned = False
+
+def get_office_pool() -> Optional[OfficePool]:
+    """The process-wide pool, or None when disabled or the UNO bindings are missing."""
+    global _pool, _warned
+    with _pool_lock:
+        if _pool is None and POOL_SIZE > 0:
+            if not uno_available():
+                if not _warned:
+                    _warned = True
+                    log.warning("DOCUMORPH_OFFICE_POOL=%d but the uno bindings are not importable "
+                                "from this interpreter; using one cold soffice per job", POOL_SIZE)
+                return None
+            _pool = OfficePool()
+            atexit.register(_pool.close)
+    return _pool
@@ -1,15 +1,35 @@
+import io
 import os
+import json
+import time
+import hashlib
 import shutil
+import sqlite3
+import tempfile
+import threading
 import subprocess
-from typing import List, Tuple
-from PIL import Image
-import fitz  # PyMuPDF
-from PyPDF2 import PdfReader, PdfWriter
-from docx import Document
-from pdf2docx import Converter
+import multiprocessing
+from html import escape
+from pathlib import Path
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional, Tuple
+from .cache import DiskCache, hash_key
+from .backends import LazyModule
+
+# Backends are imported on first use (see pdf_ops.backends), so importing this
+# module -- and therefore app.py -- stays cheap.
+fitz = LazyModule("fitz")  # PyMuPDF
+Image = LazyModule("PIL.Image")
+PyPDF2 = LazyModule("PyPDF2")
+docx = LazyModule("docx")
+pdf2docx = LazyModule("pdf2docx")
 
 UPLOADS = os.path.join(os.path.dirname(__file__), "..", "uploads")
 OUTPUTS = os.path.join(os.path.dirname(__file__), "..", "outputs")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "cache")
 os.makedirs(UPLOADS, exist_ok=True)
 os.makedirs(OUTPUTS, exist_ok=True)
 
@@ -22,176 +42,955 @@ def out_path(name:str) -> str:
 def has_binary(cmd: str) -> bool:
     return shutil.which(cmd) is not None
 
+# progress(done, total) is called as pages (or chunks) complete
+ProgressFn = Optional[Callable[[int, int], None]]
+
+def report(progress: ProgressFn, done: int, total: int) -> None:
+    if progress is not None and total:
+        progress(done, total)
+
+def parse_page_range(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Turn "1-3,5,9-" (1-based, open-ended ranges allowed) into a sorted list of
+    page numbers. Empty or "all" selects every page.
+    """
+    if not spec or spec.strip().lower() == "all":
+        return list(range(1, page_count + 1))
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                lo, hi = part.split("-", 1)
+                lo = int(lo) if lo.strip() else 1
+                hi = int(hi) if hi.strip() else page_count
+            else:
+                lo = hi = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part}")
+        if lo < 1 or hi > page_count or lo > hi:
+            raise ValueError(f"Page range {part} is outside 1-{page_count}")
+        pages.update(range(lo, hi + 1))
+    if not pages:
+        raise ValueError("No pages selected.")
+    return sorted(pages)
+
+def chunked(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# ---------- Page-parallel helpers ----------
+# Below this many pages (or images), cheap per-page work runs inline: the pool
+# round trips would cost more than the work itself.
+PARALLEL_MIN_PAGES = int(os.environ.get("DOCUMORPH_PARALLEL_MIN_PAGES", "64"))
+PAGE_POOL_IDLE = int(os.environ.get("DOCUMORPH_PAGE_POOL_IDLE", "60"))  # seconds before an idle page pool exits
+
+def cpu_share() -> int:
+    """Cores this gunicorn worker may use: the host's, divided between DOCUMORPH_WEB_WORKERS."""
+    try:
+        web_workers = max(1, int(os.environ.get("DOCUMORPH_WEB_WORKERS", "1")))
+    except ValueError:
+        web_workers = 1
+    return max(1, (os.cpu_count() or 1) // web_workers)
+
+# Set by run_inline() for the calling thread: its tools do all their work in
+# that thread, so a profiler attached to it sees the actual page work.
+_inline = threading.local()
+
+@contextmanager
+def run_inline():
+    """Run page jobs and conversion chunks in the calling thread instead of child processes."""
+    previous = getattr(_inline, "on", False)
+    _inline.on = True
+    try:
+        yield
+    finally:
+        _inline.on = previous
+
+def tool_workers(workers: Optional[int] = None, pages: Optional[int] = None, min_pages: int = 2) -> int:
+    """
+    Processes a page-parallel tool may use for `pages` pages (DOCUMORPH_TOOL_WORKERS,
+    default cpu_share()): 1 below `min_pages`, never more than one per page.
+    How many actually run at once depends on the idle cores (see borrow_core).
+    """
+    if getattr(_inline, "on", False) or (pages is not None and pages < min_pages):
+        return 1
+    if workers:
+        n = max(1, int(workers))
+    else:
+        n = max(1, int(os.environ.get("DOCUMORPH_TOOL_WORKERS", cpu_share())))
+    return min(n, pages) if pages else n
+
+# Core tokens: one per core of cpu_share(), shared by this gunicorn worker, its
+# job processes (handed over by jobs.py) and their page pools. A running job
+# holds one (hold_core); page work fans out only onto tokens it can borrow
+# without waiting, so fan-out grows and shrinks with the idle cores and never
+# oversubscribes the host.
+_core_tokens = None
+_core_tokens_lock = threading.Lock()
+
+def core_tokens():
+    global _core_tokens
+    with _core_tokens_lock:
+        if _core_tokens is None:
+            ctx = multiprocessing.get_context(os.environ.get("DOCUMORPH_MP_START", "forkserver"))
+            _core_tokens = ctx.BoundedSemaphore(cpu_share())
+    return _core_tokens
+
+def set_core_tokens(tokens) -> None:
+    """Use `tokens` (from core_tokens() in the parent) in this process; see jobs.py."""
+    global _core_tokens
+    _core_tokens = tokens
+
+@contextmanager
+def hold_core():
+    """Occupy one core token for the duration of a job."""
+    tokens = core_tokens()
+    tokens.acquire()
+    try:
+        yield
+    finally:
+        tokens.release()
+
+def borrow_core() -> bool:
+    """Take an idle core token if there is one; give it back with return_core()."""
+    return core_tokens().acquire(False)
+
+def return_core(*_) -> None:
+    core_tokens().release()
+
+class _PagePool:
+    """
+    The process pool page jobs run in, one per process and reused across
+    calls, so a 10-page job doesn't pay for starting a pool. It exits after
+    PAGE_POOL_IDLE seconds without users.
+    """
+    def __init__(self):
+        self._pool = None
+        self._users = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def acquire(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pool is None:
+                ctx = multiprocessing.get_context(os.environ.get("DOCUMORPH_MP_START", "forkserver"))
+                self._pool = ProcessPoolExecutor(max_workers=cpu_share(), mp_context=ctx,
+                                                 initializer=_init_tool_worker)
+            self._users += 1
+            return self._pool
+
+    def release(self, broken: bool = False) -> None:
+        with self._lock:
+            self._users -= 1
+            if broken and self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._users == 0 and self._pool is not None:
+                self._timer = threading.Timer(PAGE_POOL_IDLE, self._shutdown_idle)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _shutdown_idle(self) -> None:
+        with self._lock:
+            if self._users == 0 and self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            self._timer = None
+
+_page_pool = _PagePool()
+
+# Per thread: in pool processes there is one thread, but ordered_pool_map also
+# runs jobs inline in request/job threads, which must not close each other's
+# documents.
+_worker_docs = threading.local()
+
+def worker_doc(path: str):
+    """Open `path` once per worker process (or calling thread) and reuse it for every page job."""
+    docs = getattr(_worker_docs, "docs", None)
+    if docs is None:
+        docs = _worker_docs.docs = {}
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)  # pool processes outlive a call; never reuse a stale file
+    doc = docs.get(key)
+    if doc is None:
+        release_worker_docs()
+        doc = docs[key] = fitz.open(path)
+    return doc
+
+def release_worker_docs() -> None:
+    docs = getattr(_worker_docs, "docs", None) or {}
+    for doc in docs.values():
+        doc.close()
+    docs.clear()
+
+def _init_tool_worker():
+    # one Tesseract/OpenMP thread per process; the pool already uses every core
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def ordered_pool_map(func, jobs: Iterable[tuple], workers: int, window: Optional[int] = None):
+    """
+    Yield func(*job) for each job, in job order. The calling thread works
+    through the jobs itself; with workers > 1, jobs also go to this process's
+    page pool for as long as idle cores can be borrowed (up to workers - 1 at
+    a time), and at most `window` results are ever held, so memory stays
+    bounded however many pages the document has.
+    """
+    if workers <= 1:
+        try:
+            for job in jobs:
+                yield func(*job)
+        finally:
+            release_worker_docs()
+        return
+    window = max(workers, window or workers * 2)
+    pool = _page_pool.acquire()
+    pending = deque()
+    broken = False
+    try:
+        for job in jobs:
+            running = sum(1 for f in pending if not f.done())
+            if running < workers - 1 and len(pending) < window and borrow_core():
+                try:
+                    future = pool.submit(func, *job)
+                except Exception:
+                    return_core()
+                    raise
+                future.add_done_callback(return_core)
+                pending.append(future)
+            else:
+                # no idle core (or the window is full): do this job here
+                result = func(*job)
+                while pending:
+                    yield pending.popleft().result()
+                yield result
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        broken = True
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+        release_worker_docs()
+        _page_pool.release(broken)
+
 # ---------- Merge ----------
-def merge_pdfs(paths: List[str]) -> str:
-    writer = PdfWriter()
-    for p in paths:
-        reader = PdfReader(p)
-        if reader.is_encrypted:
-            raise RuntimeError(f"Encrypted file requires password: {os.path.basename(p)}")
-        for page in reader.pages:
-            writer.add_page(page)
-    out = out_path("merged.pdf")
-    with open(out, "wb") as f:
-        writer.write(f)
+def merge_pdfs(paths: List[str], titles: Optional[List[str]] = None, bookmarks: bool = True,
+               progress: ProgressFn = None) -> str:
+    """
+    Merge PDFs in order. Pages are copied at the object level with one input
+    open at a time; the final garbage=4 save merges identical objects, so a
+    font or logo shared by many inputs is stored once. With `bookmarks`, each
+    input gets a top-level bookmark (from `titles`, else its file name) with
+    its own outline nested below; outline entries without a page target
+    open the input's first page.
+    """
+    if not paths:
+        raise RuntimeError("No PDFs provided.")
+    merged = fitz.open()
+    toc = []
+    for i, p in enumerate(paths, start=1):
+        with fitz.open(p) as src:
+            if src.needs_pass:
+                raise RuntimeError(f"Encrypted file requires password: {os.path.basename(p)}")
+            start = merged.page_count
+            merged.insert_pdf(src)
+            if bookmarks:
+                title = titles[i - 1] if titles and i <= len(titles) else os.path.basename(p)
+                toc.append([1, title, start + 1])
+                level = 1
+                for lvl, t, pg, *_ in src.get_toc():
+                    # set_toc rejects level jumps; entries without a page target
+                    # (group headers, URI links) point at the input's first page
+                    level = min(lvl + 1, level + 1)
+                    toc.append([level, t, pg + start if pg > 0 else start + 1])
+        report(progress, i, len(paths))
+    if toc:
+        merged.set_toc(toc)
+    # unique per job; concurrent merges used to overwrite a shared merged.pdf
+    out = out_path(f"{base_noext(paths[0])}_merged.pdf")
+    merged.save(out, garbage=4, deflate=True)
+    merged.close()
     return out
 
-# ---------- Split (each page into its own file) ----------
-def split_pdf(path: str) -> List[str]:
-    reader = PdfReader(path)
-    outputs = []
+# ---------- Split (per page, page ranges, every N pages or target size) ----------
+SPLIT_MODES = ("pages", "ranges", "every", "size")
+
+def _write_chunk(path: str, pages: List[int], max_bytes: Optional[int] = None) -> List[str]:
+    """
+    Copy `pages` (consecutive, 1-based) into one new PDF. garbage=3 keeps only
+    the objects those pages use, so fonts/images shared by the chunk are
+    written once. With max_bytes, an oversized chunk is halved until it fits
+    (or is a single page).
+    """
+    src = worker_doc(path)
+    chunk = fitz.open()
+    chunk.insert_pdf(src, from_page=pages[0] - 1, to_page=pages[-1] - 1)
     base = base_noext(path)
-    for i, page in enumerate(reader.pages, start=1):
-        writer = PdfWriter()
-        writer.add_page(page)
-        out = out_path(f"{base}_page_{i}.pdf")
-        with open(out, "wb") as f:
-            writer.write(f)
-        outputs.append(out)
+    name = f"{base}_page_{pages[0]}.pdf" if len(pages) == 1 else f"{base}_pages_{pages[0]}-{pages[-1]}.pdf"
+    out = out_path(name)
+    chunk.save(out, garbage=3, deflate=True)
+    chunk.close()
+    if max_bytes and len(pages) > 1 and os.path.getsize(out) > max_bytes:
+        os.remove(out)
+        mid = len(pages) // 2
+        return _write_chunk(path, pages[:mid], max_bytes) + _write_chunk(path, pages[mid:], max_bytes)
+    return [out]
+
+def split_pdf(path: str, mode: str = "pages", value: Optional[str] = None,
+              workers: Optional[int] = None, progress: ProgressFn = None) -> List[str]:
+    """
+    Split a PDF into several files:
+      pages  - one file per page (default)
+      ranges - one file per comma-separated range in `value`, e.g. "1-3,4-10,11-"
+      every  - a file every `value` pages
+      size   - files of at most about `value` MB each
+    Chunks are written in parallel worker processes.
+    """
+    if mode not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode: {mode}")
+    with fitz.open(path) as doc:
+        total = doc.page_count
+    size_mb = None
+    if mode == "pages":
+        chunks = [[n] for n in range(1, total + 1)]
+    elif mode == "ranges":
+        if not value:
+            raise ValueError("Enter page ranges, e.g. 1-3,4-10")
+        chunks = [parse_page_range(part, total) for part in value.split(",") if part.strip()]
+        for c in chunks:
+            if c != list(range(c[0], c[-1] + 1)):
+                raise ValueError("Each range must be a single run of pages.")
+    elif mode == "every":
+        n = int(value or 1)
+        if n < 1:
+            raise ValueError("Pages per file must be at least 1.")
+        chunks = chunked(list(range(1, total + 1)), n)
+    else:
+        size_mb = float(value or 0)
+        if size_mb <= 0:
+            raise ValueError("Target size must be positive.")
+        # start from the average page size; _write_chunk halves anything too big
+        per_page = max(1, os.path.getsize(path) // max(1, total))
+        chunks = chunked(list(range(1, total + 1)), max(1, int(size_mb * 1024 * 1024 // per_page)))
+    max_bytes = int(size_mb * 1024 * 1024) if size_mb else None
+    jobs = ((path, c, max_bytes) for c in chunks)
+    outputs = []
+    pool = ordered_pool_map(_write_chunk, jobs, min(tool_workers(workers, total, PARALLEL_MIN_PAGES), len(chunks)))
+    for i, outs in enumerate(pool, start=1):
+        outputs.extend(outs)
+        report(progress, i, len(chunks))
     return outputs
 
-# ---------- Compress (Ghostscript if available, else PyMuPDF re-save) ----------
-def compress_pdf(path: str, quality: str = "screen") -> str:
-    # quality: screen|ebook|printer|prepress
+# ---------- Compress (in-process by default, Ghostscript optional) ----------
+# quality preset -> (target image DPI, JPEG quality)
+COMPRESS_PRESETS = {
+    "screen": (72, 40),
+    "ebook": (150, 60),
+    "printer": (300, 80),
+    "prepress": (300, 90),
+}
+GS_TIMEOUT = int(os.environ.get("DOCUMORPH_GS_TIMEOUT", "300"))
+
+def _recompress_image(path: str, xref: int, max_w: int, max_h: int, quality: int) -> Optional[bytes]:
+    """Decode image `xref`, shrink it to fit max_w x max_h and return JPEG bytes (None to keep it)."""
+    pix = fitz.Pixmap(worker_doc(path), xref)
+    if pix.alpha or pix.colorspace is None:
+        return None  # masks and transparency don't survive JPEG
+    if pix.colorspace.n not in (1, 3):
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    mode = "L" if pix.n == 1 else "RGB"
+    img = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    pix = None
+    if img.width > max_w or img.height > max_h:
+        img.thumbnail((max_w, max_h), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+def _image_bytes(doc, xrefs) -> int:
+    return sum(len(doc.xref_stream_raw(x) or b"") for x in xrefs)
+
+def _font_bytes(doc) -> int:
+    total = 0
+    for xref in range(1, doc.xref_length()):
+        for key in ("FontFile", "FontFile2", "FontFile3"):
+            kind, val = doc.xref_get_key(xref, key)
+            if kind == "xref":
+                total += len(doc.xref_stream_raw(int(val.split()[0])) or b"")
+    return total
+
+def compress_native(path: str, out: str, dpi: int = 150, quality: int = 60,
+                    workers: Optional[int] = None, progress: ProgressFn = None) -> dict:
+    """
+    Compress in-process with PyMuPDF: downsample images displayed above `dpi`
+    and re-encode them (and large non-JPEG images) as JPEG, reusing one result
+    for byte-identical image streams; subset embedded fonts; then save with
+    object streams and garbage=4 so duplicate objects collapse. Returns the
+    bytes saved per category.
+    """
+    doc = fitz.open(path)
+    # largest size each image is displayed at, in points
+    shown, meta, page_of = {}, {}, {}
+    for page in doc:
+        for img in page.get_images(full=True):
+            xref, smask, width, height, filt = img[0], img[1], img[2], img[3], img[8]
+            if smask:
+                continue
+            meta[xref] = (width, height, filt)
+            page_of.setdefault(xref, page.number)
+            for r in page.get_image_rects(xref):
+                w, h = shown.get(xref, (0, 0))
+                shown[xref] = (max(w, r.width), max(h, r.height))
+    images_before = _image_bytes(doc, shown)
+    fonts_before = _font_bytes(doc)
+
+    # one job per distinct stream; identical copies get the same result
+    groups = {}
+    for xref, (w, h) in shown.items():
+        raw = doc.xref_stream_raw(xref) or b""
+        width, height, filt = meta[xref]
+        max_w, max_h = max(1, int(w / 72 * dpi)), max(1, int(h / 72 * dpi))
+        is_jpeg = "DCT" in filt
+        if (width <= max_w * 1.1 and height <= max_h * 1.1) and (is_jpeg or len(raw) < 64 * 1024):
+            continue
+        digest = hashlib.sha256(raw).hexdigest()
+        group = groups.setdefault(digest, {"xrefs": [], "size": len(raw), "max": (0, 0)})
+        group["xrefs"].append(xref)
+        group["max"] = (max(group["max"][0], max_w), max(group["max"][1], max_h))
+
+    jobs = [(path, g["xrefs"][0], g["max"][0], g["max"][1], quality) for g in groups.values()]
+    results = ordered_pool_map(_recompress_image, jobs, tool_workers(workers, len(jobs), PARALLEL_MIN_PAGES))
+    for i, (group, data) in enumerate(zip(groups.values(), results), start=1):
+        if data is not None and len(data) < group["size"]:
+            for xref in group["xrefs"]:
+                doc[page_of[xref]].replace_image(xref, stream=data)
+        report(progress, i, len(jobs))
+    images_after = _image_bytes(doc, shown)
+
+    try:
+        doc.subset_fonts()
+    except Exception:
+        pass  # subsetting needs fontTools; the rest of the pipeline still applies
+    fonts_after = _font_bytes(doc)
+
+    doc.save(out, garbage=4, deflate=True, clean=True, use_objstms=1)
+    doc.close()
+    total = os.path.getsize(path) - os.path.getsize(out)
+    images = images_before - images_after
+    fonts = fonts_before - fonts_after
+    return {"total": total, "images": images, "fonts": fonts, "other": total - images - fonts,
+            "images_recompressed": sum(len(g["xrefs"]) for g in groups.values())}
+
+def compress_pdf(path: str, quality: str = "screen", engine: str = "native",
+                 workers: Optional[int] = None, progress: ProgressFn = None) -> str:
+    """
+    quality: screen|ebook|printer|prepress
+    engine: native (in-process, see compress_native) or gs (Ghostscript,
+    bounded by DOCUMORPH_GS_TIMEOUT). The native engine also writes a
+    <name>.json report of bytes saved per category next to the PDF.
+    """
+    if quality not in COMPRESS_PRESETS:
+        raise ValueError(f"Unknown quality: {quality}")
     out = out_path(f"{base_noext(path)}_compressed.pdf")
-    if has_binary("gs"):
-        # Ghostscript command
+    if engine == "gs":
+        if not has_binary("gs"):
+            raise RuntimeError("Ghostscript (gs) not found on PATH.")
         cmd = [
             "gs", "-sDEVICE=pdfwrite", "-dCompatibilityLevel=1.5",
             f"-dPDFSETTINGS=/{quality}", "-dNOPAUSE", "-dQUIET", "-dBATCH",
             f"-sOutputFile={out}", path
         ]
-        subprocess.run(cmd, check=True)
+        try:
+            subprocess.run(cmd, check=True, timeout=GS_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"Compression timed out after {GS_TIMEOUT}s (Ghostscript).")
         return out
-    # fallback using PyMuPDF re-writing (milder compression)
-    doc = fitz.open(path)
-    doc.save(out, deflate=True, clean=True, garbage=3)
-    doc.close()
+    dpi, jpeg_quality = COMPRESS_PRESETS[quality]
+    saved = compress_native(path, out, dpi=dpi, quality=jpeg_quality, workers=workers, progress=progress)
+    with open(compress_report_path(out), "w", encoding="utf-8") as f:
+        json.dump(saved, f)
     return out
 
+def compress_report_path(out: str) -> str:
+    return os.path.splitext(out)[0] + ".json"
+
+def compress_report(out: str) -> Optional[dict]:
+    """Bytes-saved report written by compress_pdf for `out`, if there is one."""
+    try:
+        with open(compress_report_path(out), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
 # ---------- Protect / Unlock ----------
-def protect_pdf(path: str, password: str) -> str:
-    reader = PdfReader(path)
-    writer = PdfWriter()
-    for p in reader.pages:
+def protect_pdf(path: str, password: str, progress: ProgressFn = None) -> str:
+    reader = PyPDF2.PdfReader(path)
+    writer = PyPDF2.PdfWriter()
+    total = len(reader.pages)
+    for i, p in enumerate(reader.pages, start=1):
         writer.add_page(p)
+        report(progress, i, total)
     writer.encrypt(password)
     out = out_path(f"{base_noext(path)}_protected.pdf")
     with open(out, "wb") as f:
         writer.write(f)
     return out
 
-def unlock_pdf(path: str, password: str) -> str:
-    reader = PdfReader(path)
+def unlock_pdf(path: str, password: str, progress: ProgressFn = None) -> str:
+    reader = PyPDF2.PdfReader(path)
     if reader.is_encrypted:
         if not reader.decrypt(password):
             raise RuntimeError("Incorrect password.")
-    writer = PdfWriter()
-    for p in reader.pages:
+    writer = PyPDF2.PdfWriter()
+    total = len(reader.pages)
+    for i, p in enumerate(reader.pages, start=1):
         writer.add_page(p)
+        report(progress, i, total)
     out = out_path(f"{base_noext(path)}_unlocked.pdf")
     with open(out, "wb") as f:
         writer.write(f)
     return out
 
 # ---------- Rotate ----------
-def rotate_pdf(path: str, angle: int = 90) -> str:
-    reader = PdfReader(path)
-    writer = PdfWriter()
-    for p in reader.pages:
+def rotate_pdf(path: str, angle: int = 90, progress: ProgressFn = None) -> str:
+    reader = PyPDF2.PdfReader(path)
+    writer = PyPDF2.PdfWriter()
+    total = len(reader.pages)
+    for i, p in enumerate(reader.pages, start=1):
         p.rotate(angle)
         writer.add_page(p)
+        report(progress, i, total)
     out = out_path(f"{base_noext(path)}_rotated_{angle}.pdf")
     with open(out, "wb") as f:
         writer.write(f)
     return out
 
-# ---------- Watermark (PDF watermark first page over all pages) ----------
-def watermark_pdf(path: str, watermark_pdf_path: str) -> str:
-    wm_reader = PdfReader(watermark_pdf_path)
-    wm_page = wm_reader.pages[0]
-    reader = PdfReader(path)
-    writer = PdfWriter()
-    for p in reader.pages:
-        p.merge_page(wm_page)
-        writer.add_page(p)
+# ---------- Watermark (PDF page or text, shared by every page) ----------
+WATERMARK_POSITIONS = ("fill", "center", "top-left", "top-right", "bottom-left", "bottom-right")
+
+def _xref_set_path(doc, xref: int, path: str, value: str) -> None:
+    """
+    xref_set_key for a nested key path ("Resources/ExtGState/X") whose
+    intermediate dictionaries may be indirect objects, which xref_set_key
+    refuses to walk through.
+    """
+    parts = path.split("/")
+    prefix = []
+    for part in parts[:-1]:
+        kind, val = doc.xref_get_key(xref, "/".join(prefix + [part]))
+        if kind == "xref":
+            xref, prefix = int(val.split()[0]), []
+        else:
+            prefix.append(part)
+    doc.xref_set_key(xref, "/".join(prefix + [parts[-1]]), value)
+
+def _watermark_stamp(watermark_pdf_path: Optional[str], text: Optional[str],
+                     opacity: float, fontsize: float):
+    """Build a one-page document holding the watermark, with opacity applied once."""
+    stamp = fitz.open()
+    if watermark_pdf_path:
+        with fitz.open(watermark_pdf_path) as wm:
+            page = stamp.new_page(width=wm[0].rect.width, height=wm[0].rect.height)
+            page.show_pdf_page(page.rect, wm, 0)
+        if opacity < 1:
+            # show_pdf_page leaves Resources as an indirect object
+            _xref_set_path(stamp, page.xref, "Resources/ExtGState/DMwm",
+                           f"<</Type/ExtGState/CA {opacity:g}/ca {opacity:g}>>")
+            xref = page.get_contents()[0]
+            stamp.update_stream(xref, b"/DMwm gs\n" + stamp.xref_stream(xref))
+    else:
+        width = fitz.get_text_length(text, fontsize=fontsize) + fontsize
+        page = stamp.new_page(width=width, height=width)
+        # diagonal, centred in a square box
+        centre = fitz.Point(width / 2, width / 2)
+        start = fitz.Point((width - fitz.get_text_length(text, fontsize=fontsize)) / 2,
+                           width / 2 + fontsize / 3)
+        page.insert_text(start, text, fontsize=fontsize, color=(0.5, 0.5, 0.5),
+                         fill_opacity=opacity, stroke_opacity=opacity,
+                         morph=(centre, fitz.Matrix(45)))
+    return stamp
+
+def _stamp_rect(page_rect, stamp_rect, position: str):
+    if position == "fill":
+        return page_rect
+    w = page_rect.width / 3
+    h = w * stamp_rect.height / stamp_rect.width
+    m = 24
+    x0 = {"center": (page_rect.width - w) / 2, "top-left": m, "bottom-left": m}.get(position, page_rect.width - w - m)
+    y0 = {"center": (page_rect.height - h) / 2, "top-left": m, "top-right": m}.get(position, page_rect.height - h - m)
+    return fitz.Rect(x0, y0, x0 + w, y0 + h) + (page_rect.x0, page_rect.y0, page_rect.x0, page_rect.y0)
+
+def watermark_pdf(path: str, watermark_pdf_path: Optional[str] = None, text: Optional[str] = None,
+                  opacity: float = 1.0, position: str = "fill", pages: str = "all",
+                  fontsize: float = 48, progress: ProgressFn = None) -> str:
+    """
+    Overlay the first page of `watermark_pdf_path` (or `text`) on the
+    selected pages. The watermark's content and resources are stored once as
+    a form XObject; show_pdf_page adds a small per-page wrapper XObject
+    (a few hundred bytes) that places it, instead of copying the watermark
+    into every page.
+    """
+    if not watermark_pdf_path and not text:
+        raise ValueError("Provide a watermark PDF or text.")
+    if position not in WATERMARK_POSITIONS:
+        raise ValueError(f"Unknown position: {position}")
+    opacity = min(1.0, max(0.0, float(opacity)))
+    stamp = _watermark_stamp(watermark_pdf_path, text, opacity, fontsize)
+    doc = fitz.open(path)
+    selected = select_pages(pages, doc.page_count)
+    for i, n in enumerate(selected, start=1):
+        page = doc[n - 1]
+        # the stamp page itself is grafted once; each call adds only a placing wrapper
+        page.show_pdf_page(_stamp_rect(page.rect, stamp[0].rect, position), stamp, 0, overlay=True)
+        report(progress, i, len(selected))
     out = out_path(f"{base_noext(path)}_watermarked.pdf")
-    with open(out, "wb") as f:
-        writer.write(f)
+    doc.save(out, garbage=3, deflate=True)
+    doc.close()
+    stamp.close()
     return out
 
 # ---------- Signature image (PNG/JPG) placed bottom-right ----------
-def sign_pdf_with_image(path: str, image_path: str, scale: float = 0.25) -> str:
-    doc = fitz.open(path)
-    for page in doc:
+def select_pages(spec: Optional[str], page_count: int) -> List[int]:
+    """Like parse_page_range, but also accepts "first" and "last"."""
+    spec = (spec or "all").strip().lower()
+    if spec == "first":
+        return [1]
+    if spec == "last":
+        return [page_count]
+    return parse_page_range(spec, page_count)
+
+def _stamp_signature(doc, image: bytes, size: Tuple[int, int], scale: float, pages: Optional[str],
+                     progress: ProgressFn = None) -> None:
+    """
+    Embed `image` once in `doc` and reference that single image object from
+    every selected page.
+    """
+    img_w, img_h = size
+    xref = 0
+    selected = select_pages(pages, doc.page_count)
+    for i, n in enumerate(selected, start=1):
+        page = doc[n - 1]
         rect = page.rect
-        img = fitz.Pixmap(image_path)
         # scale image to width fraction
         target_w = rect.width * scale
-        ratio = target_w / img.width
-        target_h = img.height * ratio
+        target_h = img_h * target_w / img_w
         # bottom-right margin
         x1 = rect.x1 - target_w - 36
         y1 = rect.y1 - target_h - 36
-        x2 = x1 + target_w
-        y2 = y1 + target_h
-        page.insert_image(fitz.Rect(x1, y1, x2, y2), filename=image_path, keep_proportion=True)
+        r = fitz.Rect(x1, y1, x1 + target_w, y1 + target_h)
+        if xref:
+            page.insert_image(r, xref=xref, keep_proportion=True)
+        else:
+            xref = page.insert_image(r, stream=image, keep_proportion=True)
+        report(progress, i, len(selected))
+
+def _read_signature(image_path: str) -> Tuple[bytes, Tuple[int, int]]:
+    with open(image_path, "rb") as f:
+        image = f.read()
+    with Image.open(io.BytesIO(image)) as im:  # header only, no full decode
+        return image, im.size
+
+def sign_pdf_with_image(path: str, image_path: str, scale: float = 0.25, pages: str = "all",
+                        progress: ProgressFn = None) -> str:
+    """pages: all | first | last | ranges such as "1,3-5"."""
+    image, size = _read_signature(image_path)
+    doc = fitz.open(path)
+    _stamp_signature(doc, image, size, scale, pages, progress)
     out = out_path(f"{base_noext(path)}_signed.pdf")
-    doc.save(out)
+    doc.save(out, garbage=3, deflate=True)
     doc.close()
     return out
 
+def sign_pdfs_with_image(paths: List[str], image_path: str, scale: float = 0.25, pages: str = "all",
+                         progress: ProgressFn = None) -> List[str]:
+    """Sign a batch of PDFs with one signature image, read once for the whole batch."""
+    image, size = _read_signature(image_path)
+    outs = []
+    for i, path in enumerate(paths, start=1):
+        doc = fitz.open(path)
+        _stamp_signature(doc, image, size, scale, pages)
+        out = out_path(f"{base_noext(path)}_signed.pdf")
+        doc.save(out, garbage=3, deflate=True)
+        doc.close()
+        outs.append(out)
+        report(progress, i, len(paths))
+    return outs
+
 # ---------- Extract text ----------
-def extract_text(path: str) -> str:
-    out = out_path(f"{base_noext(path)}_text.txt")
-    doc = fitz.open(path)
+TEXT_FORMATS = {"text": "txt", "blocks": "txt", "json": "jsonl"}  # format -> file extension
+TEXT_CHUNK_PAGES = 50  # pages per job in parallel mode
+
+def _page_text(page, n: int, fmt: str) -> str:
+    """
+    One page of output. "text" is the page's plain text, "blocks" its text
+    blocks in reading order separated by blank lines, and "json" a single
+    JSON line with every block, line and span and their bounding boxes.
+    """
+    if fmt == "json":
+        blocks = []
+        for b in page.get_text("dict", sort=True)["blocks"]:
+            if b["type"] != 0:  # image block
+                continue
+            blocks.append({"bbox": [round(v, 2) for v in b["bbox"]], "lines": [
+                {"bbox": [round(v, 2) for v in line["bbox"]], "spans": [
+                    {"text": span["text"], "bbox": [round(v, 2) for v in span["bbox"]],
+                     "font": span["font"], "size": round(span["size"], 2)}
+                    for span in line["spans"]]}
+                for line in b["lines"]]})
+        return json.dumps({"page": n, "width": round(page.rect.width, 2),
+                           "height": round(page.rect.height, 2), "blocks": blocks},
+                          ensure_ascii=False) + "\n"
+    if fmt == "blocks":
+        text = "\n\n".join(b[4].strip() for b in page.get_text("blocks", sort=True) if b[6] == 0)
+    else:
+        text = page.get_text()
+    return f"--- Page {n} ---\n{text}\n\n"
+
+def _text_pages(path: str, pages: List[int], fmt: str) -> str:
+    doc = worker_doc(path)
+    return "".join(_page_text(doc[n - 1], n, fmt) for n in pages)
+
+def iter_text(path: str, fmt: str = "text", parallel: bool = False,
+              workers: Optional[int] = None, progress: ProgressFn = None) -> Iterable[str]:
+    """
+    Yield the extracted text page by page (in parallel mode, chunk by
+    chunk), always in page order, so callers can stream it as it comes.
+    """
+    if fmt not in TEXT_FORMATS:
+        raise ValueError(f"Unknown text format: {fmt}")
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    size = TEXT_CHUNK_PAGES if parallel else 1
+    jobs = [(path, pages, fmt) for pages in chunked(list(range(1, page_count + 1)), size)]
+    workers = min(tool_workers(workers, page_count, PARALLEL_MIN_PAGES), len(jobs)) if parallel else 1
+    done = 0
+    for (_, pages, _), text in zip(jobs, ordered_pool_map(_text_pages, jobs, workers)):
+        done += len(pages)
+        report(progress, done, page_count)
+        yield text
+
+def extract_text(path: str, fmt: str = "text", parallel: bool = False,
+                 workers: Optional[int] = None, progress: ProgressFn = None) -> str:
+    """Write the text of every page to a file; see iter_text for the options."""
+    out = out_path(f"{base_noext(path)}_text.{TEXT_FORMATS.get(fmt, 'txt')}")
     with open(out, "w", encoding="utf-8") as f:
-        for i, page in enumerate(doc, start=1):
-            f.write(f"--- Page {i} ---\n")
-            f.write(page.get_text())
-            f.write("\n\n")
-    doc.close()
+        for text in iter_text(path, fmt, parallel, workers, progress):
+            f.write(text)
     return out
 
 # ---------- PDF → DOCX ----------
-def pdf_to_docx(path: str) -> str:
-    out = out_path(f"{base_noext(path)}_converted.docx")
+DOCX_CHUNK_PAGES = int(os.environ.get("DOCUMORPH_DOCX_CHUNK", "20"))    # pages per conversion chunk, 0 = whole document
+DOCX_CHUNK_TIMEOUT = int(os.environ.get("DOCUMORPH_DOCX_TIMEOUT", "120"))  # seconds before a chunk falls back to text
+
+def _docx_text_only(path: str, pages: List[int], out: str) -> None:
+    """Text-only fallback: one heading paragraph and the plain text per page."""
+    d = docx.Document()
+    with fitz.open(path) as doc:
+        for n in pages:
+            d.add_paragraph(f"--- Page {n} ---")
+            d.add_paragraph(doc[n - 1].get_text())
+    d.save(out)
+
+def _convert_docx_chunk(path: str, start: int, end: int, out: str) -> None:
+    # runs in its own process so a chunk that hangs can be killed
+    cv = pdf2docx.Converter(path)
     try:
-        # best-effort layout conversion
-        cv = Converter(path)
-        cv.convert(out, start=0, end=None)
+        cv.convert(out, start=start, end=end)
+    finally:
         cv.close()
-        return out
-    except Exception:
-        # fallback: text-only
-        doc = fitz.open(path)
-        d = Document()
-        for i, p in enumerate(doc, start=1):
-            d.add_paragraph(f"--- Page {i} ---")
-            d.add_paragraph(p.get_text())
-        d.save(out)
-        doc.close()
-        return out
+
+def _run_docx_chunks(path: str, chunks: List[List[int]], workers: int, timeout: int,
+                     tmpdir: str, progress: ProgressFn) -> List[str]:
+    """
+    Convert each chunk of pages in its own process, at most `workers` at a
+    time. A chunk that fails or exceeds `timeout` is killed and replaced by
+    the text-only conversion of just those pages. Under run_inline() the
+    chunks are converted one by one in this thread, without the timeout.
+    """
+    outs = [os.path.join(tmpdir, f"chunk_{i}.docx") for i in range(len(chunks))]
+    if getattr(_inline, "on", False):
+        for i, pages in enumerate(chunks):
+            try:
+                _convert_docx_chunk(path, pages[0] - 1, pages[-1], outs[i])
+            except Exception:
+                _docx_text_only(path, pages, outs[i])
+            report(progress, i + 1, len(chunks))
+        return outs
+    from multiprocessing.connection import wait
+    ctx = multiprocessing.get_context(os.environ.get("DOCUMORPH_MP_START", "forkserver"))
+    todo = deque(enumerate(chunks))
+    running = {}  # chunk index -> (process, deadline, borrowed core)
+    done = 0
+    try:
+        while todo or running:
+            # one chunk runs on this job's own core, any others on borrowed idle cores
+            while todo and len(running) < workers:
+                own_core_busy = any(not borrowed for _, _, borrowed in running.values())
+                if own_core_busy and not borrow_core():
+                    break
+                borrowed = own_core_busy
+                i, pages = todo.popleft()
+                proc = ctx.Process(target=_convert_docx_chunk, args=(path, pages[0] - 1, pages[-1], outs[i]))
+                proc.start()
+                running[i] = (proc, time.monotonic() + timeout, borrowed)
+            next_deadline = min(deadline for _, deadline, _ in running.values())
+            # wake up now and then to pick up cores other jobs have freed
+            wait([proc.sentinel for proc, _, _ in running.values()],
+                 timeout=min(1.0, max(0, next_deadline - time.monotonic())))
+            for i, (proc, deadline, borrowed) in list(running.items()):
+                if proc.is_alive():
+                    if time.monotonic() < deadline:
+                        continue
+                    proc.kill()
+                proc.join()
+                del running[i]
+                if borrowed:
+                    return_core()
+                if proc.exitcode != 0 or not os.path.exists(outs[i]):
+                    _docx_text_only(path, chunks[i], outs[i])
+                done += 1
+                report(progress, done, len(chunks))
+    finally:
+        for proc, _, borrowed in running.values():
+            proc.kill()
+            proc.join()
+            if borrowed:
+                return_core()
+    return outs
+
+def _plain_sectpr(sect_pr):
+    """Copy of a section's page setup without header/footer references."""
+    from copy import deepcopy
+    from docx.oxml.ns import qn
+    sect_pr = deepcopy(sect_pr)
+    for ref in sect_pr.findall(qn("w:headerReference")) + sect_pr.findall(qn("w:footerReference")):
+        sect_pr.remove(ref)
+    return sect_pr
+
+def _append_docx(dest, src) -> None:
+    """
+    Append the body of `src` to `dest` as a new section. Images are re-added
+    to dest's package (deduplicated by hash) and hyperlink relationships
+    re-created, with r:ids in the copied XML rewritten to match.
+    """
+    from copy import deepcopy
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    body = dest.element.body
+    sect_pr = body.get_or_add_sectPr()
+    # end dest's last section with a section break that keeps its page setup
+    brk, ppr = OxmlElement("w:p"), OxmlElement("w:pPr")
+    ppr.append(_plain_sectpr(sect_pr))
+    brk.append(ppr)
+    sect_pr.addprevious(brk)
+
+    rid_attrs = (qn("r:embed"), qn("r:link"), qn("r:id"))
+    rids = {}
+    for el in src.element.body.iterchildren():
+        if el.tag == qn("w:sectPr"):
+            continue
+        el = deepcopy(el)
+        for node in el.iter():
+            for attr in rid_attrs:
+                rid = node.get(attr)
+                if rid is None or rid not in src.part.rels:
+                    continue
+                if rid not in rids:
+                    rel = src.part.rels[rid]
+                    if rel.is_external:
+                        rids[rid] = dest.part.relate_to(rel.target_ref, rel.reltype, is_external=True)
+                    elif rel.reltype == RT.IMAGE:
+                        rids[rid], _ = dest.part.get_or_add_image(io.BytesIO(rel.target_part.blob))
+                    else:
+                        rids[rid] = dest.part.relate_to(rel.target_part, rel.reltype)
+                node.set(attr, rids[rid])
+        sect_pr.addprevious(el)
+    if src.element.body.sectPr is not None:
+        body.replace(sect_pr, _plain_sectpr(src.element.body.sectPr))
+
+def pdf_to_docx(path: str, chunk_pages: Optional[int] = None, workers: Optional[int] = None,
+                timeout: Optional[int] = None, progress: ProgressFn = None) -> str:
+    """
+    Layout conversion with pdf2docx. Pages are converted in chunks of
+    `chunk_pages` (0 = one chunk) by up to `workers` parallel processes and
+    the chunk documents stitched together in page order. A chunk that fails
+    or runs past `timeout` seconds falls back to text-only for its pages
+    alone, so one bad page no longer costs the layout of the whole file.
+    """
+    out = out_path(f"{base_noext(path)}_converted.docx")
+    with fitz.open(path) as doc:
+        page_count = doc.page_count
+    if page_count == 0:
+        raise RuntimeError("PDF has no pages.")
+    size = DOCX_CHUNK_PAGES if chunk_pages is None else chunk_pages
+    chunks = chunked(list(range(1, page_count + 1)), size if size > 0 else page_count)
+    workers = min(tool_workers(workers, page_count), len(chunks))
+    with tempfile.TemporaryDirectory(prefix="docx_chunks_") as tmpdir:
+        parts = _run_docx_chunks(path, chunks, workers, timeout or DOCX_CHUNK_TIMEOUT, tmpdir, progress)
+        if len(parts) == 1:
+            shutil.move(parts[0], out)
+            return out
+        merged = docx.Document(parts[0])
+        for part in parts[1:]:
+            _append_docx(merged, docx.Document(part))
+        merged.save(out)
+    return out
 
 # ---------- PDF ↔ Images ----------
-def pdf_to_images(path: str, fmt: str = "png") -> List[str]:
+def _render_pages(path: str, pages: List[int], ext: str, dpi: int,
+                  gray: bool, quality: int) -> List[str]:
+    """Render a chunk of pages, encoding each pixmap straight to its file."""
+    doc = worker_doc(path)
+    cs = fitz.csGRAY if gray else fitz.csRGB
+    outs = []
+    for n in pages:
+        pix = doc[n - 1].get_pixmap(dpi=dpi, colorspace=cs, alpha=False)
+        fn = out_path(f"{base_noext(path)}_page_{n}.{ext}")
+        pix.save(fn, jpg_quality=quality)
+        outs.append(fn)
+    return outs
+
+def pdf_to_images(path: str, fmt: str = "png", dpi: int = 72, gray: bool = False,
+                  quality: int = 85, pages: Optional[str] = None,
+                  workers: Optional[int] = None, progress: ProgressFn = None) -> List[str]:
+    """
+    Render pages to PNG/JPG. `pages` is a range spec ("1-5,8"); `quality`
+    only applies to JPG. Chunks of pages render in parallel worker
+    processes, each with its own handle on the document.
+    """
     fmt = fmt.lower()
     assert fmt in ("png", "jpg", "jpeg")
-    doc = fitz.open(path)
+    ext = "jpg" if fmt in ("jpg", "jpeg") else "png"
+    with fitz.open(path) as doc:
+        selected = parse_page_range(pages, doc.page_count)
+    workers = tool_workers(workers, len(selected))
+    # several chunks per worker so a slow page doesn't leave the others idle
+    chunks = chunked(selected, max(1, min(16, len(selected) // (workers * 4) or 1)))
+    jobs = ((path, chunk, ext, dpi, gray, quality) for chunk in chunks)
     outs = []
-    for i, page in enumerate(doc, start=1):
-        pix = page.get_pixmap()
-        fn = out_path(f"{base_noext(path)}_page_{i}.{ 'jpg' if fmt in ('jpg','jpeg') else 'png'}")
-        pix.save(fn)
-        outs.append(fn)
-    doc.close()
+    for chunk_outs in ordered_pool_map(_render_pages, jobs, workers):
+        outs.extend(chunk_outs)
+        report(progress, len(outs), len(selected))
     return outs
 
-def images_to_pdf(image_paths: List[str]) -> str:
-    imgs = [Image.open(p).convert("RGB") for p in image_paths]
-    out = out_path("images_to_pdf.pdf")
-    if not imgs:
+def images_to_pdf(image_paths: List[str], progress: ProgressFn = None) -> str:
+    if not image_paths:
         raise RuntimeError("No images provided.")
+    imgs = []
+    for i, p in enumerate(image_paths, start=1):
+        imgs.append(Image.open(p).convert("RGB"))
+        report(progress, i, len(image_paths))
+    # named after the first (uniquely named) upload, like every other tool's output
+    out = out_path(f"{base_noext(image_paths[0])}_images.pdf")
     first, rest = imgs[0], imgs[1:]
     first.save(out, save_all=True, append_images=rest)
     for im in imgs:
@@ -202,111 +1001,374 @@ def images_to_pdf(image_paths: List[str]) -> str:
 def office_to_pdf(path: str) -> str:
     """
     Convert DOC/DOCX/XLS/XLSX/PPT/PPTX to PDF using LibreOffice (soffice).
+    Uses the warm instance pool in pdf_ops.office when the UNO bindings are
+    installed, otherwise a cold soffice run with a private profile and
+    output directory. Either way each job is bounded by JOB_TIMEOUT.
     """
+    from .office import get_office_pool, JOB_TIMEOUT
     if not has_binary("soffice"):
         raise RuntimeError("LibreOffice (soffice) not found on PATH.")
-    out_dir = OUTPUTS
-    cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", out_dir, path]
-    subprocess.run(cmd, check=True)
-    # LibreOffice writes with original base name + .pdf
     out = out_path(f"{base_noext(path)}.pdf")
+    pool = get_office_pool()
+    if pool is not None:
+        pool.convert(path, out)
+    else:
+        with tempfile.TemporaryDirectory(prefix="soffice_") as tmp:
+            profile = Path(tmp, "profile").as_uri()
+            out_dir = os.path.join(tmp, "out")
+            cmd = ["soffice", f"-env:UserInstallation={profile}", "--headless",
+                   "--convert-to", "pdf", "--outdir", out_dir, path]
+            try:
+                subprocess.run(cmd, check=True, timeout=JOB_TIMEOUT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except subprocess.TimeoutExpired:
+                raise RuntimeError(f"Conversion timed out after {JOB_TIMEOUT}s (LibreOffice).")
+            # LibreOffice writes with original base name + .pdf
+            produced = os.path.join(out_dir, f"{base_noext(path)}.pdf")
+            if os.path.isfile(produced):
+                shutil.move(produced, out)
     if not os.path.isfile(out):
         raise RuntimeError("Conversion failed (LibreOffice).")
     return out
 
 # ---------- Extract Images (all embedded images from PDF) ----------
-def extract_images(path: str) -> List[str]:
+def _extract_xrefs(path: str, items: List[Tuple[int, str]], mode: str, min_bytes: int) -> List[str]:
+    """Write each (xref, file stem) in `items`; returns the files written."""
+    doc = worker_doc(path)
     outs = []
-    doc = fitz.open(path)
-    for page_num, page in enumerate(doc, start=1):
-        for img_index, img in enumerate(page.get_images(full=True), start=1):
-            xref = img[0]
+    for xref, stem in items:
+        if mode == "native":
+            # JPEG/JPX/JBIG2 streams come back as stored, without decoding
+            img = doc.extract_image(xref)
+            data, ext = img["image"], img["ext"]
+        else:
             pix = fitz.Pixmap(doc, xref)
-            if pix.n > 4:  # CMYK
+            if pix.n - pix.alpha > 3:  # CMYK
                 pix = fitz.Pixmap(fitz.csRGB, pix)
-            fn = out_path(f"{base_noext(path)}_p{page_num}_{img_index}.png")
-            pix.save(fn)
-            outs.append(fn)
-            pix = None
-    doc.close()
+            data, ext = pix.tobytes("png"), "png"
+        if len(data) < min_bytes:
+            continue
+        fn = out_path(f"{stem}.{ext}")
+        with open(fn, "wb") as f:
+            f.write(data)
+        outs.append(fn)
+    return outs
+
+def extract_images(path: str, mode: str = "native", min_bytes: int = 0, min_width: int = 0,
+                   min_height: int = 0, workers: Optional[int] = None,
+                   progress: ProgressFn = None) -> List[str]:
+    """
+    Write every distinct embedded image once, named after the first page it
+    appears on. mode="native" keeps the stored encoding (a JPEG stays the
+    original JPEG bytes); mode="png" decodes and re-encodes everything as PNG.
+    Images smaller than min_bytes / min_width x min_height are skipped.
+    """
+    if mode not in ("native", "png"):
+        raise ValueError(f"Unknown mode: {mode}")
+    base = base_noext(path)
+    items, seen = [], set()
+    with fitz.open(path) as doc:
+        for page_num, page in enumerate(doc, start=1):
+            for img_index, img in enumerate(page.get_images(full=True), start=1):
+                xref, width, height = img[0], img[2], img[3]
+                if xref in seen or width < min_width or height < min_height:
+                    continue
+                seen.add(xref)
+                items.append((xref, f"{base}_p{page_num}_{img_index}"))
+    if not items:
+        return []
+    workers = tool_workers(workers, len(items), PARALLEL_MIN_PAGES)
+    chunks = chunked(items, max(1, min(32, len(items) // (workers * 4) or 1)))
+    outs = []
+    jobs = ((path, chunk, mode, min_bytes) for chunk in chunks)
+    for i, chunk_outs in enumerate(ordered_pool_map(_extract_xrefs, jobs, workers), start=1):
+        outs.extend(chunk_outs)
+        report(progress, i, len(chunks))
     return outs
 
 
 # ---------- PDF → Excel (table extraction) ----------
-def pdf_to_excel(path: str) -> str:
+TABLE_MIN_RULES = 6      # ruling lines/rects that make a page a lattice-table candidate
+TABLE_MIN_COLUMNS = 3    # aligned word columns that make a page a stream-table candidate
+TABLE_MIN_ROWS = 4       # lines a column must span to count as aligned
+XLSX_CELL_MAX = 32767    # Excel's per-cell character limit
+
+def _table_flavor(page) -> Optional[str]:
     """
-    Extracts tables into XLSX. Requires camelot or tabula.
+    Cheap PyMuPDF guess at whether a page holds a table: ruling lines mean
+    camelot's "lattice" flavor, words starting at the same x on many lines
+    in several columns mean "stream". None means no table worth parsing.
     """
-    out = out_path(f"{base_noext(path)}.xlsx")
+    rules = 0
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "re":
+                rules += 1
+            elif item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1 or abs(p1.x - p2.x) < 1:
+                    rules += 1
+        if rules >= TABLE_MIN_RULES:
+            return "lattice"
+    columns = {}
+    for x0, _, _, _, _, block, line, _ in page.get_text("words"):
+        columns.setdefault(round(x0 / 4), set()).add((block, line))
+    aligned = sum(1 for lines in columns.values() if len(lines) >= TABLE_MIN_ROWS)
+    return "stream" if aligned >= TABLE_MIN_COLUMNS else None
+
+def _extract_page_tables(path: str, page: int, flavor: str) -> List[List[List[str]]]:
+    """Run camelot on one page; returns each table as a list of rows."""
     try:
         import camelot
-        tables = camelot.read_pdf(path, pages="all")
-        if tables:
-            tables.export(out, f="excel")
-            return out
-        else:
-            raise RuntimeError("No tables found.")
+        tables = camelot.read_pdf(path, pages=str(page), flavor=flavor)
     except Exception:
-        # fallback: dump text into XLSX
-        import openpyxl
-        doc = fitz.open(path)
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        # camelot missing, or a page it can't parse: no tables from this page
+        return []
+    return [t.df.values.tolist() for t in tables]
+
+def pdf_to_excel(path: str, streaming: bool = True, workers: Optional[int] = None,
+                 progress: ProgressFn = None) -> str:
+    """
+    Extracts tables into XLSX, one sheet per table, using camelot.
+    A PyMuPDF pre-pass picks the pages that look tabular (and the camelot
+    flavor for each); only those are parsed, one page per worker process.
+    With `streaming` the workbook is written in openpyxl's write-only mode,
+    so rows go to disk as they arrive instead of building it in memory.
+    If no tables are found (or camelot isn't installed), the text of each
+    page is written instead.
+    """
+    import openpyxl
+    out = out_path(f"{base_noext(path)}.xlsx")
+    with fitz.open(path) as doc:
+        total = doc.page_count
+        candidates = []
         for i, page in enumerate(doc, start=1):
-            ws.append([f"--- Page {i} ---"])
-            ws.append([page.get_text()])
-            ws.append([])
-        wb.save(out)
-        doc.close()
-        return out
+            flavor = _table_flavor(page)
+            if flavor:
+                candidates.append((path, i, flavor))
+        total += len(candidates)
+        report(progress, doc.page_count, total)
 
+    wb = openpyxl.Workbook(write_only=streaming)
+    if not streaming:
+        wb.remove(wb.active)
+    sheets = 0
+    done = total - len(candidates)
+    results = ordered_pool_map(_extract_page_tables, candidates, tool_workers(workers, len(candidates)))
+    for (_, page, _), tables in zip(candidates, results):
+        for k, rows in enumerate(tables, start=1):
+            ws = wb.create_sheet(f"Page {page} Table {k}")
+            for row in rows:
+                ws.append([str(cell)[:XLSX_CELL_MAX] for cell in row])
+            sheets += 1
+        done += 1
+        report(progress, done, total)
 
-# ---------- PDF → HTML ----------
-def pdf_to_html(path: str) -> str:
-    out = out_path(f"{base_noext(path)}.html")
-    doc = fitz.open(path)
-    html = ["<html><body>"]
-    for i, page in enumerate(doc, start=1):
-        html.append(f"<h2>Page {i}</h2>")
-        html.append("<pre>")
-        html.append(page.get_text("text"))
-        html.append("</pre>")
-    html.append("</body></html>")
-    with open(out, "w", encoding="utf-8") as f:
-        f.write("\n".join(html))
-    doc.close()
+    if not sheets:
+        # fallback: dump text into XLSX
+        ws = wb.create_sheet("Text")
+        with fitz.open(path) as doc:
+            for i, page in enumerate(doc, start=1):
+                ws.append([f"--- Page {i} ---"])
+                ws.append([page.get_text()[:XLSX_CELL_MAX]])
+                ws.append([])
+    wb.save(out)
     return out
 
 
+# ---------- PDF → HTML ----------
+HTML_LAYOUTS = ("positioned", "xhtml")
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body{{background:#eee;margin:0}}
+.page{{position:relative;margin:12pt auto;background:#fff;box-shadow:0 0 4pt #999;overflow:hidden}}
+.page span{{position:absolute;white-space:pre;line-height:1}}
+.page img{{position:absolute}}
+.flow{{padding:24pt;box-sizing:border-box}}
+.flow img{{position:static;max-width:100%}}
+iframe.page{{display:block;border:0}}
+</style></head><body>
+"""
+_HTML_TAIL = "</body></html>\n"
+
+def _html_asset(doc, xref: int, stem: str) -> str:
+    """
+    Write image `xref` once as a browser-friendly file and return its name.
+    JPEG/PNG keep their stored bytes; other encodings, and images with a
+    soft mask, are decoded to PNG.
+    """
+    img = doc.extract_image(xref)
+    if img["ext"] in ("jpeg", "png") and not img.get("smask"):
+        data, ext = img["image"], img["ext"]
+    else:
+        pix = fitz.Pixmap(doc, xref)
+        if pix.n - pix.alpha > 3:  # CMYK
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        if img.get("smask"):
+            pix = fitz.Pixmap(pix, fitz.Pixmap(doc, img["smask"]))
+        data, ext = pix.tobytes("png"), "png"
+    name = f"{stem}.{ext}"
+    with open(out_path(name), "wb") as f:
+        f.write(data)
+    return name
+
+def _css_box(rect) -> str:
+    return (f"left:{rect[0]:.2f}pt;top:{rect[1]:.2f}pt;"
+            f"width:{rect[2] - rect[0]:.2f}pt;height:{rect[3] - rect[1]:.2f}pt")
+
+def _html_page(doc, page, n: int, layout: str, assets: dict, base: str) -> str:
+    """HTML for one page; images are written to `assets` (xref -> file name) on first use."""
+    width, height = page.rect.width, page.rect.height
+    images = []
+    for info in page.get_image_info(xrefs=True):
+        xref = info["xref"]
+        if not xref:  # inline image, no object to share
+            continue
+        if xref not in assets:
+            assets[xref] = _html_asset(doc, xref, f"{base}_asset_{xref}")
+        images.append((assets[xref], info["bbox"]))
+
+    if layout == "xhtml":
+        # semantic XHTML without embedded base64 images; ours are shared files
+        flags = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+        parts = [f'<div class="page flow" id="page-{n}" style="width:{width:.2f}pt">',
+                 page.get_text("xhtml", flags=flags)]
+        parts += [f'<img src="{escape(name)}" alt="" style="width:{bbox[2] - bbox[0]:.2f}pt">'
+                  for name, bbox in images]
+        parts.append("</div>")
+        return "\n".join(parts)
+
+    parts = [f'<div class="page" id="page-{n}" style="width:{width:.2f}pt;height:{height:.2f}pt">']
+    parts += [f'<img src="{escape(name)}" alt="" style="{_css_box(bbox)}">' for name, bbox in images]
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] != 0:
+            continue
+        for line in block["lines"]:
+            for span in line["spans"]:
+                if not span["text"].strip():
+                    continue
+                font = span["font"].split("+", 1)[-1].replace("'", "")  # drop subset prefix
+                style = (f"left:{span['bbox'][0]:.2f}pt;top:{span['bbox'][1]:.2f}pt;"
+                         f"font-size:{span['size']:.2f}pt;font-family:'{font}',sans-serif;"
+                         f"color:#{span['color']:06x}")
+                if span["flags"] & 16:
+                    style += ";font-weight:bold"
+                if span["flags"] & 2:
+                    style += ";font-style:italic"
+                parts.append(f'<span style="{escape(style)}">{escape(span["text"])}</span>')
+    parts.append("</div>")
+    return "\n".join(parts)
+
+def pdf_to_html(path: str, layout: str = "positioned", per_page: bool = False,
+                progress: ProgressFn = None):
+    """
+    HTML export written page by page, so memory stays flat however long the
+    document is. layout="positioned" places every text span and image where
+    it sits on the page; "xhtml" gives reflowable semantic markup. Each
+    embedded image is stored once as a shared asset file. With `per_page`,
+    every page is also its own HTML file and the main file just lazy-loads
+    them. Returns the HTML path, or a list (HTML first) when there are extra
+    files.
+    """
+    if layout not in HTML_LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    base = base_noext(path)
+    out = out_path(f"{base}.html")
+    outs = [out]
+    assets = {}
+    with fitz.open(path) as doc, open(out, "w", encoding="utf-8") as index:
+        index.write(_HTML_HEAD.format(title=escape(base)))
+        for n, page in enumerate(doc, start=1):
+            html = _html_page(doc, page, n, layout, assets, base)
+            if per_page:
+                fn = out_path(f"{base}_page_{n}.html")
+                with open(fn, "w", encoding="utf-8") as f:
+                    f.write(_HTML_HEAD.format(title=f"{escape(base)} - page {n}") + html + "\n" + _HTML_TAIL)
+                outs.append(fn)
+                index.write(f'<iframe class="page" src="{escape(os.path.basename(fn))}" loading="lazy" '
+                            f'title="Page {n}" style="width:{page.rect.width + 24:.2f}pt;'
+                            f'height:{page.rect.height + 24:.2f}pt"></iframe>\n')
+            else:
+                index.write(html + "\n")
+            report(progress, n, doc.page_count)
+        index.write(_HTML_TAIL)
+    outs.extend(out_path(name) for name in assets.values())
+    return outs if len(outs) > 1 else out
+
+
 # ---------- OCR PDF ----------
-def pdf_ocr(path: str, lang: str = "eng") -> str:
+OCR_DPI = int(os.environ.get("DOCUMORPH_OCR_DPI", "300"))
+OCR_CACHE_MB = int(os.environ.get("DOCUMORPH_OCR_CACHE_MB", "512"))  # 0 disables the cache
+_ocr_cache = None
+
+def ocr_cache() -> Optional[DiskCache]:
+    """Per-process handle on the on-disk OCR page cache (None when disabled)."""
+    global _ocr_cache
+    if _ocr_cache is None and OCR_CACHE_MB > 0:
+        _ocr_cache = DiskCache(os.path.join(CACHE_DIR, "ocr"), OCR_CACHE_MB * 1024 * 1024)
+    return _ocr_cache
+
+def ocr_cache_stats() -> dict:
+    """Hit/miss/eviction counters and size of the OCR cache, summed over all processes."""
+    cache = ocr_cache()
+    return cache.stats() if cache else {}
+
+def _ocr_page(path: str, index: int, lang: str, dpi: int, use_cache: bool = True) -> bytes:
+    """Rasterize one page and return Tesseract's single-page PDF for it."""
+    from pytesseract import image_to_pdf_or_hocr
+    pix = worker_doc(path)[index].get_pixmap(dpi=dpi)
+    cache = ocr_cache() if use_cache else None
+    if cache:
+        # keyed on the rendered pixels, so repeated cover sheets and re-uploads hit
+        key = hash_key(pix.samples_mv, f"{pix.width}x{pix.height}x{pix.n}", lang, str(dpi), "pdf")
+        page_pdf = cache.get(key)
+        if page_pdf is not None:
+            return page_pdf
+    img = Image.open(io.BytesIO(pix.tobytes("png")))
+    page_pdf = image_to_pdf_or_hocr(img, lang=lang, extension="pdf", config=f"--dpi {dpi}")
+    if cache:
+        try:
+            cache.put(key, page_pdf)
+        except (OSError, sqlite3.Error):
+            pass  # caching is best-effort; the page itself is fine
+    return page_pdf
+
+def pdf_ocr(path: str, lang: str = "eng", dpi: Optional[int] = None, workers: Optional[int] = None,
+            window: Optional[int] = None, use_cache: bool = True, progress: ProgressFn = None) -> str:
     """
     OCR scanned PDF into searchable PDF.
     Requires pytesseract and tesseract installed.
+    Pages are rasterized and recognised in `workers` processes (at most
+    `window` pages in flight) and stitched back into one PDF in page order.
+    Pages already seen (same pixels, lang and DPI) come from the OCR cache.
     """
-    from pytesseract import image_to_pdf_or_hocr
+    dpi = int(dpi or OCR_DPI)
     out = out_path(f"{base_noext(path)}_ocr.pdf")
-    doc = fitz.open(path)
-    pdf_bytes = b""
-    for page in doc:
-        pix = page.get_pixmap(dpi=300)
-        img_bytes = pix.tobytes("png")
-        pdf_bytes += image_to_pdf_or_hocr(Image.open(
-            fitz.BytesIO(img_bytes)), lang=lang, extension="pdf")
-    with open(out, "wb") as f:
-        f.write(pdf_bytes)
-    doc.close()
+    with fitz.open(path) as src:
+        total = src.page_count
+    result = fitz.open()
+    jobs = ((path, i, lang, dpi, use_cache) for i in range(total))
+    pages = ordered_pool_map(_ocr_page, jobs, tool_workers(workers, total), window)
+    for i, page_pdf in enumerate(pages, start=1):
+        with fitz.open(stream=page_pdf, filetype="pdf") as page_doc:
+            result.insert_pdf(page_doc)
+        report(progress, i, total)
+    result.save(out, garbage=3, deflate=True)
+    result.close()
     return out
 
 
 # ---------- Reorder Pages ----------
-def reorder_pages(path: str, new_order: List[int]) -> str:
-    reader = PdfReader(path)
-    writer = PdfWriter()
+def reorder_pages(path: str, new_order: List[int], progress: ProgressFn = None) -> str:
+    reader = PyPDF2.PdfReader(path)
+    writer = PyPDF2.PdfWriter()
     num_pages = len(reader.pages)
-    for i in new_order:
+    for n, i in enumerate(new_order, start=1):
         if 1 <= i <= num_pages:
             writer.add_page(reader.pages[i-1])
+        report(progress, n, len(new_order))
     out = out_path(f"{base_noext(path)}_reordered.pdf")
     with open(out, "wb") as f:
         writer.write(f)
@@ -0,0 +1,101 @@
+import io
+import os
+import time
+import pstats
+import random
+import cProfile
+import functools
+import tracemalloc
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PROFILE_DIR = os.environ.get("DOCUMORPH_PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+SAMPLE_RATE = float(os.environ.get("DOCUMORPH_PROFILE_SAMPLE", "0"))  # fraction of jobs profiled, 0..1
+TRACE_FRAMES = int(os.environ.get("DOCUMORPH_PROFILE_FRAMES", "10"))  # traceback depth kept by tracemalloc
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+def sampled() -> bool:
+    """True for the configured fraction of jobs; a single float compare when sampling is off."""
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def artifact_paths(profile_id: str):
+    """(pstats file, text report) for a profiled job."""
+    return (os.path.join(PROFILE_DIR, f"{profile_id}.prof"),
+            os.path.join(PROFILE_DIR, f"{profile_id}.txt"))
+
+
+class Profiled:
+    """
+    Picklable wrapper that runs a tool under cProfile and tracemalloc and
+    writes <id>.prof (load with pstats or snakeviz) and <id>.txt (top
+    functions by cumulative time and top allocation sites) to PROFILE_DIR.
+
+    functools.update_wrapper keeps the tool's name and signature visible, so
+    the executor still routes it to the right lane and injects `progress`.
+    cProfile only sees the calling thread, so the tool runs under
+    pdf_ops.tools.run_inline(): page jobs and PDF -> Word chunks run in this
+    thread rather than in child processes (slower, but every frame is in
+    the profile; external binaries like tesseract or gs still aren't).
+    tracemalloc is process-wide, so a profiled job in the thread lane also
+    sees its neighbours' allocations.
+    """
+    def __init__(self, func, profile_id: str):
+        functools.update_wrapper(self, func)
+        self.profile_id = profile_id
+
+    def __call__(self, *args, **kwargs):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        tracing = not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        from pdf_ops.tools import run_inline
+        prof = cProfile.Profile()
+        started = time.perf_counter()
+        error = None
+        prof.enable()
+        try:
+            with run_inline():
+                return self.__wrapped__(*args, **kwargs)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            prof.disable()
+            wall = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+            self._write(prof, snapshot, wall, peak, error)
+
+    def _write(self, prof, snapshot, wall: float, peak: int, error: Optional[BaseException]):
+        prof_path, report_path = artifact_paths(self.profile_id)
+        prof.dump_stats(prof_path)
+
+        out = io.StringIO()
+        out.write(f"tool: {self.__name__}\n")
+        out.write(f"profile: {self.profile_id}\n")
+        out.write(f"wall time: {wall:.3f}s\n")
+        out.write(f"peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+        if error is not None:
+            out.write(f"failed: {type(error).__name__}: {error}\n")
+        out.write(f"\n=== Top {TOP_FUNCTIONS} functions by cumulative time ===\n")
+        pstats.Stats(prof, stream=out).strip_dirs().sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+        out.write(f"\n=== Top {TOP_ALLOCATIONS} allocation sites (live at end of run) ===\n")
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS]:
+            out.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+            for line in stat.traceback.format(most_recent_first=True):
+                out.write(line + "\n")
+
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
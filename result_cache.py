@@ -0,0 +1,92 @@
+import os
+import json
+from uuid import uuid4
+from typing import List, Optional
+
+from pdf_ops.cache import DiskCache, hash_key, copy_file
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Byte budget for cached tool outputs (0 disables the result cache)
+RESULT_CACHE_MB = int(os.environ.get("DOCUMORPH_RESULT_CACHE_MB", "1024"))
+
+
+def result_key(tool: str, digests: List[str], params: dict) -> str:
+    """Cache key for running `tool` on inputs with these sha256 digests and params."""
+    return hash_key(tool, *digests, json.dumps(params, sort_keys=True, default=str))
+
+
+class ResultCache:
+    """
+    Content-addressed cache of tool outputs.
+
+    Each key maps to a small JSON manifest listing the output file names
+    (with the input's base name replaced by "{base}") plus one cached blob per
+    output file. Outputs are copied into and out of the cache (never
+    hard-linked, so a later run reusing an output name can't alter a cached
+    result) and the regular outputs/ cleanup never touches the cache; the
+    cache's own byte budget and LRU eviction bound its size.
+    """
+    def __init__(self, root: str, max_bytes: int, outputs: str):
+        self.outputs = outputs
+        self._cache = DiskCache(root, max_bytes)
+
+    def lookup(self, key: str, base: str):
+        """
+        Re-materialize cached outputs (and their side files) in outputs/
+        named after `base` and return the outputs (a path, or a list for
+        multi-file tools), or None on a miss.
+        """
+        manifest = self._cache.get(key)
+        if manifest is None:
+            return None
+        manifest = json.loads(manifest)
+        names = manifest["files"] + manifest.get("side", [])
+        blobs = [self._cache.get_path(f"{key}-{i}", count=False) for i in range(len(names))]
+        if None in blobs:  # a member was evicted on its own
+            return None
+        prefix = uuid4().hex[:8]
+        outs = []
+        try:
+            for name, blob in zip(names, blobs):
+                name = name.replace("{base}", base) if "{base}" in name else f"{prefix}_{name}"
+                dst = os.path.join(self.outputs, name)
+                copy_file(blob, dst)
+                outs.append(dst)
+        except OSError:
+            # a blob was evicted by another process after get_path; treat it as a miss
+            for dst in outs:
+                if os.path.exists(dst):
+                    os.remove(dst)
+            return None
+        outs = outs[:len(manifest["files"])]
+        return outs if manifest["multi"] else outs[0]
+
+    def store(self, key: str, base: str, result, side_files=()) -> None:
+        """
+        Cache `result` plus `side_files`: files the tool wrote next to its
+        outputs (e.g. compress_pdf's JSON report) that are restored with them
+        but not returned as results.
+        """
+        multi = isinstance(result, (list, tuple))
+        paths = list(result) if multi else [result]
+        names = []
+        for i, p in enumerate(paths + list(side_files)):
+            self._cache.put_file(f"{key}-{i}", p)
+            name = os.path.basename(p)
+            names.append(name.replace(base, "{base}", 1) if base and base in name else name)
+        manifest = {"multi": multi, "files": names[:len(paths)], "side": names[len(paths):]}
+        self._cache.put(key, json.dumps(manifest).encode("utf-8"))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+_cache = None
+
+def get_result_cache(outputs: str) -> Optional[ResultCache]:
+    global _cache
+    if _cache is None and RESULT_CACHE_MB > 0:
+        _cache = ResultCache(os.path.join(BASE_DIR, "cache", "results"),
+                             RESULT_CACHE_MB * 1024 * 1024, outputs)
+    return _cache
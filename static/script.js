@@ -47,7 +47,12 @@ document.addEventListener("DOMContentLoaded", function () {
           const txt = await res.text();
           throw new Error("Server did not return JSON.\n\n" + txt);
         }
-        return res.json();
+        const data = await res.json();
+        // 503 + Retry-After when the job queue is full
+        if (!res.ok) {
+          throw new Error(data.error || "Server is busy, please retry shortly.");
+        }
+        return data;
       })
       .then((data) => {
         if (!data.task_id) {
@@ -56,29 +61,66 @@ document.addEventListener("DOMContentLoaded", function () {
 
         const taskId = data.task_id;
 
-        const interval = setInterval(() => {
-          fetch(`/progress/${taskId}`)
-            .then((r) => r.json())
-            .then((p) => {
-              const prog = p.progress ?? 0;
-              progressBar.style.width = prog + "%";
-              progressText.textContent = prog + "%";
-
-              if (p.status === "error") {
-                clearInterval(interval);
-                downloadLink.innerHTML = `<div style="color:#E13B34;font-weight:600;">${p.error || "Conversion failed."}</div>`;
-              } else if (p.status === "done" && p.download_url) {
+        // Draw one progress update; returns true once the task has finished.
+        const render = (p) => {
+          const prog = p.progress ?? 0;
+          progressBar.style.width = prog + "%";
+          progressText.textContent = p.status === "queued"
+            ? `Queued (#${p.position})`
+            : prog + "%" + (p.eta != null ? ` (~${Math.ceil(p.eta)}s left)` : "");
+
+          if (p.status === "error") {
+            downloadLink.innerHTML = `<div style="color:#E13B34;font-weight:600;">${p.error || "Conversion failed."}</div>`;
+            return true;
+          } else if (p.status === "done" && p.download_url) {
+            progressBar.style.width = "100%";
+            progressText.textContent = "100%";
+            const details = (p.details || []).map((d) => `<li>${d}</li>`).join("");
+            downloadLink.innerHTML = (details ? `<ul class="list">${details}</ul>` : "")
+              + `<a class="result-btn" href="${p.download_url}">Download Result</a>`;
+            return true;
+          } else if (p.status === "done") {
+            downloadLink.innerHTML = `<div style="font-weight:600;">Nothing to download for this file.</div>`;
+            return true;
+          }
+          return false;
+        };
+
+        // Fallback for browsers/proxies without Server-Sent Events.
+        const poll = () => {
+          const interval = setInterval(() => {
+            fetch(`/progress/${taskId}`)
+              .then((r) => r.json())
+              .then((p) => {
+                if (render(p)) clearInterval(interval);
+              })
+              .catch((err) => {
                 clearInterval(interval);
-                progressBar.style.width = "100%";
-                progressText.textContent = "100%";
-                downloadLink.innerHTML = `<a class="result-btn" href="${p.download_url}">Download Result</a>`;
-              }
-            })
-            .catch((err) => {
-              clearInterval(interval);
-              downloadLink.innerHTML = `<div style="color:#E13B34;font-weight:600;">${err.message}</div>`;
-            });
-        }, 500);
+                downloadLink.innerHTML = `<div style="color:#E13B34;font-weight:600;">${err.message}</div>`;
+              });
+          }, 500);
+        };
+
+        if (!window.EventSource) {
+          poll();
+          return;
+        }
+
+        // The server only pushes when the task changes and closes the stream
+        // periodically; EventSource reconnects by itself in that case. A busy
+        // server refuses the stream (503), which lands in onerror -> poll().
+        const source = new EventSource(`/progress/${taskId}/stream`);
+        let received = false;
+        source.onmessage = (ev) => {
+          received = true;
+          if (render(JSON.parse(ev.data))) source.close();
+        };
+        source.onerror = () => {
+          if (!received || source.readyState === EventSource.CLOSED) {
+            source.close();
+            poll();
+          }
+        };
       })
       .catch((err) => {
         if (downloadLink) {
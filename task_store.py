@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import threading
+from typing import Optional
+
+from pdf_ops.cache import LocalConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# How long a finished (or abandoned) task stays visible to /progress, in seconds
+TASK_TTL = int(os.environ.get("DOCUMORPH_TASK_TTL", "3600"))
+
+
+class MemoryTaskStore:
+    """
+    In-process task registry. Only correct with a single worker process
+    (e.g. `flask run`), kept for local development and tests.
+    """
+    shared = False
+
+    def __init__(self, ttl: int = TASK_TTL):
+        self.ttl = ttl
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str, **fields) -> dict:
+        now = time.time()
+        task = {"status": "running", "progress": 0, "output": None, "error": None}
+        task.update(fields)
+        with self._lock:
+            self._purge(now)
+            self._tasks[task_id] = {"data": task, "version": 1, "expires": now + self.ttl}
+        return dict(task)
+
+    def update(self, task_id: str, **fields) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._tasks.get(task_id)
+            if row is None:
+                return None
+            row["data"].update(fields)
+            row["version"] += 1
+            row["expires"] = now + self.ttl
+            return dict(row["data"])
+
+    def get(self, task_id: str) -> Optional[dict]:
+        row = self._tasks.get(task_id)
+        if row is None or row["expires"] < time.time():
+            return None
+        return dict(row["data"], version=row["version"])
+
+    def _purge(self, now: float):
+        for k in [k for k, v in self._tasks.items() if v["expires"] < now]:
+            del self._tasks[k]
+
+
+class SQLiteTaskStore:
+    """
+    Task registry shared by every gunicorn worker (and pool process) on the host.
+
+    Each task is one row keyed by task_id holding its fields as JSON. Updates
+    run inside BEGIN IMMEDIATE so concurrent writers never lose each other's
+    fields, and `version` is bumped on every write so readers can tell cheaply
+    whether anything changed. WAL mode keeps /progress reads from blocking on
+    writers.
+    """
+    shared = True
+
+    def __init__(self, path: str, ttl: int = TASK_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = LocalConnection(self.path)
+        self._last_purge = 0.0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " version INTEGER NOT NULL DEFAULT 1,"
+            " expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_expires ON tasks (expires)")
+
+    def create(self, task_id: str, **fields) -> dict:
+        now = time.time()
+        task = {"status": "running", "progress": 0, "output": None, "error": None}
+        task.update(fields)
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, data, version, expires) VALUES (?, ?, 1, ?)",
+            (task_id, json.dumps(task), now + self.ttl),
+        )
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            conn.execute("DELETE FROM tasks WHERE expires < ?", (now,))
+        return task
+
+    def update(self, task_id: str, **fields) -> Optional[dict]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            task = json.loads(row[0])
+            task.update(fields)
+            conn.execute(
+                "UPDATE tasks SET data = ?, version = version + 1, expires = ? WHERE id = ?",
+                (json.dumps(task), time.time() + self.ttl, task_id),
+            )
+            conn.execute("COMMIT")
+            return task
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, task_id: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT data, version FROM tasks WHERE id = ? AND expires >= ?",
+            (task_id, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]), version=row[1])
+
+
+_store = None
+
+def get_task_store():
+    """
+    Return the process-wide task store, configured from the environment:
+    DOCUMORPH_TASK_STORE = sqlite (default) | memory
+    DOCUMORPH_TASK_DB    = path of the SQLite file shared by all workers
+    """
+    global _store
+    if _store is None:
+        backend = os.environ.get("DOCUMORPH_TASK_STORE", "sqlite").lower()
+        if backend == "memory":
+            _store = MemoryTaskStore()
+        elif backend == "sqlite":
+            path = os.environ.get("DOCUMORPH_TASK_DB", os.path.join(BASE_DIR, "tasks.db"))
+            _store = SQLiteTaskStore(path)
+        else:
+            raise RuntimeError(f"Unknown DOCUMORPH_TASK_STORE backend: {backend}")
+    return _store
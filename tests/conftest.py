@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app, with its task/metrics/janitor databases in a temp dir."""
+    pytest.importorskip("fitz")
+    pytest.importorskip("flask")
+    tmp = tmp_path_factory.mktemp("state")
+    for var, name in (("DOCUMORPH_TASK_DB", "tasks.db"), ("DOCUMORPH_METRICS_DB", "metrics.db"),
+                      ("DOCUMORPH_JANITOR_DB", "janitor.db")):
+        os.environ.setdefault(var, str(tmp / name))
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    """Test client writing uploads, outputs and cached results under tmp_path."""
+    import result_cache
+    from pdf_ops import tools
+    for module in (app_module, tools):
+        monkeypatch.setattr(module, "OUTPUTS", str(tmp_path))
+    monkeypatch.setattr(app_module, "UPLOADS", str(tmp_path))
+    monkeypatch.setenv("DOCUMORPH_TOOL_WORKERS", "1")  # pool processes wouldn't see the patched OUTPUTS
+    monkeypatch.setattr(result_cache, "_cache", result_cache.ResultCache(
+        str(tmp_path / "cache"), 10 * 1024 * 1024, str(tmp_path)))
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
@@ -0,0 +1,12 @@
+def test_startup_requires_the_admin_token(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/startup").status_code == 403
+    assert client.get("/startup", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    resp = client.get("/startup", headers={"X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert "backends" in resp.get_json()
+
+
+def test_startup_is_closed_without_a_configured_token(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "ADMIN_TOKEN", "")
+    assert client.get("/startup", headers={"X-Admin-Token": ""}).status_code == 403
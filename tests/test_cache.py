@@ -0,0 +1,35 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pdf_ops.cache import DiskCache
+
+
+def test_concurrent_puts_of_one_key_from_threads(tmp_path):
+    cache = DiskCache(str(tmp_path), 64 * 1024 * 1024)
+    data = b"x" * 256 * 1024
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache.put("k" * 64, data), range(64)))
+    assert cache.get("k" * 64) == data
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_ocr_page_survives_a_failing_cache_write(tmp_path, monkeypatch):
+    pytest.importorskip("pytesseract")
+    fitz = pytest.importorskip("fitz")
+    from pdf_ops import tools
+    if not tools.has_binary("tesseract"):
+        pytest.skip("tesseract not installed")
+    cache = DiskCache(str(tmp_path / "ocr"), 64 * 1024 * 1024)
+
+    def full_disk(key, data):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(cache, "put", full_disk)
+    monkeypatch.setattr(tools, "_ocr_cache", cache)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "hello")
+    doc.save(str(tmp_path / "in.pdf"))
+    doc.close()
+    page_pdf = tools._ocr_page(str(tmp_path / "in.pdf"), 0, "eng", 72)
+    assert fitz.open(stream=io.BytesIO(page_pdf), filetype="pdf").page_count == 1
@@ -0,0 +1,29 @@
+import io
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+
+def _pdf():
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"page {n}")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _post(client, data, ajax):
+    headers = {"X-Requested-With": "XMLHttpRequest"} if ajax else {}
+    return client.post("/compress", data={"file": (io.BytesIO(data), "in.pdf"), "quality": "ebook"},
+                       content_type="multipart/form-data", headers=headers)
+
+
+def test_cached_ajax_result_reports_bytes_saved(client):
+    data = _pdf()
+    assert b"KB saved" in _post(client, data, ajax=False).data  # runs and caches the result
+    task_id = _post(client, data, ajax=True).get_json()["task_id"]  # answered from the cache
+    progress = client.get(f"/progress/{task_id}").get_json()
+    assert progress["status"] == "done"
+    assert any(d.startswith("Total: ") for d in progress["details"])
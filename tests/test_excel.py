@@ -0,0 +1,31 @@
+import sys
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+openpyxl = pytest.importorskip("openpyxl")
+
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+
+
+def test_tables_fall_back_to_text_without_camelot(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "camelot", None)  # import camelot raises ImportError
+    doc = fitz.open()
+    page = doc.new_page()
+    for row in range(8):  # a ruled grid, so the page is picked as a table candidate
+        page.draw_line((72, 72 + row * 20), (372, 72 + row * 20))
+        for col in range(4):
+            page.insert_text((76 + col * 75, 86 + row * 20), f"r{row}c{col}")
+    path = str(tmp_path / "grid.pdf")
+    doc.save(path)
+    doc.close()
+    assert tools._table_flavor(fitz.open(path)[0]) == "lattice"
+
+    wb = openpyxl.load_workbook(tools.pdf_to_excel(path, workers=1))
+    assert wb.sheetnames == ["Text"]
+    assert "r0c0" in wb["Text"]["A2"].value
@@ -0,0 +1,50 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+
+
+def _pdf(path, pages):
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"page {n} of {path.stem}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _expected(name, pages):
+    return "".join(f"--- Page {n} ---\npage {n} of {name}\n\n\n" for n in range(1, pages + 1))
+
+
+def test_concurrent_extract_text(tmp_path):
+    pdfs = [_pdf(tmp_path / f"doc{i}.pdf", 200) for i in range(4)]
+    with ThreadPoolExecutor(4) as pool:
+        texts = list(pool.map(lambda p: "".join(tools.iter_text(p)), pdfs * 3))
+    for p, text in zip(pdfs * 3, texts):
+        assert text == _expected(p.rsplit("/", 1)[-1][:-4], 200)
+
+
+def test_concurrent_text_streams(client, tmp_path):
+    pdfs = [_pdf(tmp_path / f"doc{i}.pdf", 200) for i in range(4)]
+
+    def stream(p):
+        with open(p, "rb") as f:
+            resp = client.post("/extract-text/stream", data={"file": (io.BytesIO(f.read()), "in.pdf")},
+                               content_type="multipart/form-data", buffered=False)
+        return resp.status_code, b"".join(resp.response).decode()
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(stream, pdfs * 2))
+    for p, (status, text) in zip(pdfs * 2, results):
+        assert status == 200
+        assert text == _expected(p.rsplit("/", 1)[-1][:-4], 200)
@@ -0,0 +1,48 @@
+import io
+import os
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+AJAX = {"X-Requested-With": "XMLHttpRequest"}
+
+
+def _pdf():
+    doc = fitz.open()
+    doc.new_page(width=612, height=792)
+    data = doc.tobytes()
+    doc.close()
+    return io.BytesIO(data)
+
+
+@pytest.mark.parametrize("path, field, value", [
+    ("/pdf-to-images", "dpi", "high"),
+    ("/pdf-to-images", "quality", "nan"),
+    ("/watermark", "opacity", "half"),
+    ("/rotate", "angle", "45"),
+    ("/extract-images", "min_kb", "1e3"),
+    ("/pdf-ocr", "dpi", "300dpi"),
+])
+def test_bad_numbers_are_rejected_with_400(client, path, field, value):
+    resp = client.post(path, data={"file": (_pdf(), "in.pdf"), field: value, "text": "x"},
+                       content_type="multipart/form-data", headers=AJAX)
+    assert resp.status_code == 400
+    assert resp.get_json()["error"]
+
+
+def test_bad_number_in_plain_form_flashes_and_redirects(client):
+    resp = client.post("/pdf-to-images", data={"file": (_pdf(), "in.pdf"), "dpi": "high"},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/pdf-to-images")
+    with client.session_transaction() as session:
+        assert session["_flashes"] == [("message", "DPI must be a number.")]
+
+
+def test_out_of_range_dpi_is_clamped(client, tmp_path):
+    resp = client.post("/pdf-to-images", data={"file": (_pdf(), "in.pdf"), "dpi": "1"},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200
+    png = next(p for p in os.listdir(tmp_path) if p.endswith(".png"))
+    assert fitz.Pixmap(str(tmp_path / png)).width == 306  # 612 pt at the 36 DPI minimum
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from jobs import JobExecutor, _Lane
+from task_store import MemoryTaskStore
+
+
+def _wait(cond, timeout=5):
+    deadline = time.time() + timeout
+    while not cond():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _finish(store):
+    def on_done(task_id, future):
+        store.update(task_id, status="done" if future.exception() is None else "error")
+    return on_done
+
+
+@pytest.fixture
+def executor():
+    ex = JobExecutor(MemoryTaskStore(), thread_workers=1, max_queue=4)
+    yield ex
+    ex._finisher.shutdown(wait=True)
+
+
+def test_failing_on_start_frees_the_slot(executor):
+    def on_start(task_id):
+        raise RuntimeError("metrics down")
+    executor.submit("a", time.sleep, (0,), on_start=on_start, on_done=_finish(executor.store))
+    executor.submit("b", time.sleep, (0,), on_done=_finish(executor.store))
+    _wait(lambda: executor.store.get("b")["status"] == "done")
+    assert executor.store.get("a")["status"] == "error"
+
+
+def test_failing_on_done_marks_the_task_failed(executor):
+    def on_done(task_id, future):
+        raise RuntimeError("disk full")
+    executor.submit("a", time.sleep, (0,), on_done=on_done)
+    executor.submit("b", time.sleep, (0,), on_done=_finish(executor.store))
+    _wait(lambda: executor.store.get("b")["status"] == "done")
+    assert executor.store.get("a")["status"] == "error"
+    assert executor.store.get("a")["error"] == "disk full"
+
+
+class _Pool:
+    def __init__(self):
+        self.shut = False
+
+    def submit(self, func, *args, **kwargs):
+        f = Future()
+        f.set_exception(BrokenProcessPool("worker died"))
+        return f
+
+    def shutdown(self, wait=True):
+        self.shut = True
+
+
+def test_broken_pool_is_not_cleared_once_replaced():
+    store = MemoryTaskStore()
+    finisher = ThreadPoolExecutor(1)
+    lane = _Lane("process", _Pool, 2, 4, store, finisher)
+    broken = lane._pool = _Pool()
+    fresh = _Pool()
+    job = {"task_id": "a", "func": time.sleep, "args": (0,), "kwargs": {}, "on_done": None, "on_start": None}
+    store.create("a")
+    lane._running = 1
+    future = broken.submit(time.sleep, 0)
+    lane._pool = fresh  # another job already replaced the broken pool
+    lane._done(job, broken, future)
+    finisher.shutdown(wait=True)
+    assert lane._pool is fresh
+    assert broken.shut and not fresh.shut
+    assert lane._running == 0
+
+
+def test_ghostscript_compression_runs_in_the_thread_lane(tmp_path):
+    from task_store import SQLiteTaskStore
+    from pdf_ops.tools import compress_pdf, pdf_to_images
+    ex = JobExecutor(SQLiteTaskStore(str(tmp_path / "tasks.db")))
+    assert ex.lane_for(compress_pdf, {"engine": "gs"}) == "thread"
+    assert ex.lane_for(compress_pdf, {"engine": "native"}) == "process"
+    assert ex.lane_for(pdf_to_images, {"engine": "gs"}) == "process"
+
+
+def test_process_lane_jobs_hold_a_core(tmp_path, monkeypatch):
+    import multiprocessing
+    from task_store import SQLiteTaskStore
+    from pdf_ops import tools
+    tokens = multiprocessing.get_context("forkserver").BoundedSemaphore(1)
+    monkeypatch.setattr(tools, "_core_tokens", tokens)
+    monkeypatch.setenv("DOCUMORPH_MP_START", "forkserver")
+    ex = JobExecutor(SQLiteTaskStore(str(tmp_path / "tasks.db")), process_workers=1)
+    results = []
+    # inside the job the only token is taken, so page work can't borrow one
+    ex.submit("a", tools.borrow_core, on_done=lambda task_id, f: results.append(f.result()))
+    _wait(lambda: results, timeout=60)
+    assert results == [False]
+    assert tokens.acquire(False)  # and the job gave it back
+    ex._lanes["process"]._pool.shutdown()
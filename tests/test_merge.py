@@ -0,0 +1,32 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+
+
+def _pdf(path, pages, toc=None):
+    doc = fitz.open()
+    for n in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {n + 1}")
+    if toc:
+        doc.set_toc(toc)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_merge_keeps_outline_entries_without_a_page(tmp_path):
+    web = {"kind": fitz.LINK_URI, "uri": "https://example.com"}
+    first = _pdf(tmp_path / "a.pdf", 2)
+    second = _pdf(tmp_path / "b.pdf", 3, [[1, "A", 1], [2, "Web", -1, web], [3, "C", 2]])
+    assert [row[2] for row in fitz.open(second).get_toc()] == [1, -1, 2]
+
+    with fitz.open(tools.merge_pdfs([first, second], titles=["first", "second"])) as merged:
+        toc = merged.get_toc()
+    assert toc == [[1, "first", 1], [1, "second", 3], [2, "A", 3], [3, "Web", 3], [4, "C", 4]]
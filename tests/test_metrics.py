@@ -0,0 +1,55 @@
+import io
+import re
+import time
+
+import jobs
+from pdf_ops import tools
+from pdf_ops.cache import DiskCache
+
+
+def test_ocr_cache_counters_are_exported(client, tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "ocr"), 1024 * 1024)
+    monkeypatch.setattr(tools, "_ocr_cache", cache)
+    cache.put("k" * 64, b"page text")
+    cache.get("k" * 64)
+    cache.get("m" * 64)
+    cache.get("n" * 64)
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE documorph_cache_hits_total counter" in body
+    assert 'documorph_cache_hits_total{cache="ocr"} 1' in body
+    assert 'documorph_cache_misses_total{cache="ocr"} 2' in body
+    assert 'documorph_cache_entries{cache="ocr"} 1' in body
+    assert 'documorph_cache_bytes{cache="ocr"} 9' in body
+
+
+def test_tool_runs_are_exported(client, monkeypatch):
+    def pdf():
+        doc = tools.fitz.open()
+        doc.new_page()
+        data = doc.tobytes()
+        doc.close()
+        return io.BytesIO(data)
+
+    # the thread lane keeps the job in this process, where OUTPUTS is patched
+    monkeypatch.setattr(jobs, "SUBPROCESS_TOOLS", jobs.SUBPROCESS_TOOLS | {"rotate_pdf"})
+    assert client.post("/rotate", data={"file": (pdf(), "in.pdf"), "angle": "90"},
+                       content_type="multipart/form-data").status_code == 200
+    task_id = client.post("/rotate", data={"file": (pdf(), "in.pdf"), "angle": "180"},
+                          content_type="multipart/form-data",
+                          headers={"X-Requested-With": "XMLHttpRequest"}).get_json()["task_id"]
+    deadline = time.time() + 10
+    while client.get(f"/progress/{task_id}").get_json()["status"] != "done":
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE documorph_requests_total counter" in body
+    assert 'documorph_requests_total{mode="sync",tool="rotate_pdf"}' in body
+    assert 'documorph_requests_total{mode="async",tool="rotate_pdf"}' in body
+    assert "# TYPE documorph_run_seconds histogram" in body
+    count = re.search(r'^documorph_run_seconds_count\{tool="rotate_pdf"\} (\S+)$', body, re.M)
+    assert count and float(count.group(1)) >= 2
+    assert re.search(r'^documorph_run_seconds_bucket\{tool="rotate_pdf",le="\+Inf"\} ', body, re.M)
+    assert re.search(r'^documorph_queue_wait_seconds_count\{tool="rotate_pdf"\} ', body, re.M)
+    assert "# TYPE documorph_active_jobs gauge" in body
+    assert re.search(r'^documorph_active_jobs\{state="running",tool="rotate_pdf"\} 0', body, re.M)
@@ -0,0 +1,59 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+
+
+def _pdf(path, pages):
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"page {n} of {path.name}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_inline_page_jobs_in_concurrent_threads(tmp_path):
+    # workers=1 runs in the calling thread; threads must not close each other's documents
+    pdfs = [_pdf(tmp_path / f"in{i}.pdf", 20) for i in range(4)]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda p: tools.pdf_to_images(p, workers=1), pdfs * 3))
+    assert all(len(outs) == 20 for outs in results)
+
+
+def test_small_jobs_stay_inline():
+    assert tools.tool_workers(4, pages=10, min_pages=tools.PARALLEL_MIN_PAGES) == 1
+    assert tools.tool_workers(4, pages=10) == 4
+    assert tools.tool_workers(8, pages=3) == 3
+
+
+def test_fan_out_only_onto_idle_cores(monkeypatch):
+    tokens = threading.BoundedSemaphore(3)
+    monkeypatch.setattr(tools, "_core_tokens", tokens)
+    held = [tokens.acquire(False) for _ in range(3)]  # every core busy with other jobs
+    assert all(held)
+    pids = list(tools.ordered_pool_map(os.getpid, [()] * 20, workers=4))
+    assert set(pids) == {os.getpid()}
+
+    for _ in held:
+        tokens.release()
+    pids = list(tools.ordered_pool_map(os.getpid, [()] * 200, workers=4))
+    assert len(pids) == 200 and len(set(pids)) > 1
+    assert all(tokens.acquire(False) for _ in range(3))  # every borrowed core came back
+
+
+def test_page_pool_is_reused():
+    list(tools.ordered_pool_map(os.getpid, [()] * 8, workers=2))
+    pool = tools._page_pool._pool
+    list(tools.ordered_pool_map(os.getpid, [()] * 8, workers=2))
+    assert pool is not None and tools._page_pool._pool is pool
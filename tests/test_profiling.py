@@ -0,0 +1,41 @@
+import pstats
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+import profiling
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+
+
+def _pdf(path, pages):
+    doc = fitz.open()
+    for n in range(1, pages + 1):
+        doc.new_page().insert_text((72, 72), f"page {n}")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _profiled_functions(profile_id):
+    prof_path, _ = profiling.artifact_paths(profile_id)
+    return {name for _, _, name in pstats.Stats(prof_path).stats}
+
+
+def test_profiled_page_jobs_run_in_process(tmp_path):
+    outs = profiling.Profiled(tools.pdf_to_images, "images")(_pdf(tmp_path / "in.pdf", 6), workers=4)
+    assert len(outs) == 6
+    assert "_render_pages" in _profiled_functions("images")
+    assert tools.tool_workers(4) == 4  # only the profiled call runs inline
+
+
+def test_profiled_docx_chunks_run_in_process(tmp_path):
+    pytest.importorskip("pdf2docx")
+    profiling.Profiled(tools.pdf_to_docx, "docx")(_pdf(tmp_path / "in.pdf", 4), chunk_pages=2, workers=2)
+    assert "_convert_docx_chunk" in _profiled_functions("docx")
@@ -0,0 +1,12 @@
+import threading
+
+
+def test_progress_streams_are_capped(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "_open_streams", threading.BoundedSemaphore(1))
+    first = client.get("/progress/nope/stream", buffered=False)
+    assert first.status_code == 200
+    busy = client.get("/progress/nope/stream")
+    assert busy.status_code == 503
+    assert client.get("/progress/nope").status_code == 200  # polling still works
+    first.close()
+    assert client.get("/progress/nope/stream").status_code == 200
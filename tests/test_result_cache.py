@@ -0,0 +1,57 @@
+import os
+
+from result_cache import ResultCache
+
+
+def test_cached_result_survives_output_name_reuse(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    cache = ResultCache(str(tmp_path / "cache"), 10 * 1024 * 1024, str(outputs))
+    out = outputs / "abc_images.pdf"
+    out.write_bytes(b"document A")
+    cache.store("key-a", "abc", str(out))
+
+    # a later run writes the same output name in place
+    with open(out, "r+b") as f:
+        f.write(b"document B")
+
+    hit = cache.lookup("key-a", "def")
+    assert os.path.basename(hit) == "def_images.pdf"
+    with open(hit, "rb") as f:
+        assert f.read() == b"document A"
+
+
+def test_side_files_are_restored_with_the_output(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    cache = ResultCache(str(tmp_path / "cache"), 10 * 1024 * 1024, str(outputs))
+    out = outputs / "abc_compressed.pdf"
+    out.write_bytes(b"pdf")
+    side = outputs / "abc_compressed.json"
+    side.write_text('{"total": 1}')
+    cache.store("key-a", "abc", str(out), [str(side)])
+
+    hit = cache.lookup("key-a", "def")
+    assert os.path.basename(hit) == "def_compressed.pdf"
+    assert (outputs / "def_compressed.json").read_text() == '{"total": 1}'
+
+
+def test_blob_evicted_during_lookup_is_a_miss(tmp_path, monkeypatch):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    cache = ResultCache(str(tmp_path / "cache"), 10 * 1024 * 1024, str(outputs))
+    pages = [outputs / f"abc_page{i}.png" for i in (1, 2)]
+    for p in pages:
+        p.write_bytes(b"png")
+    cache.store("key-a", "abc", [str(p) for p in pages])
+
+    get_path = cache._cache.get_path
+    def evicted_after_lookup(key, count=True):
+        path = get_path(key, count)
+        if key.endswith("-1"):
+            os.remove(path)  # another worker's eviction wins the race
+        return path
+    monkeypatch.setattr(cache._cache, "get_path", evicted_after_lookup)
+
+    assert cache.lookup("key-a", "def") is None
+    assert not list(outputs.glob("def_*"))
@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+
+def _pdf(with_image):
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    if with_image:
+        pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+        pix.set_rect(pix.irect, (200, 30, 30))
+        page.insert_image(fitz.Rect(72, 72, 272, 272), pixmap=pix)
+    data = doc.tobytes()
+    doc.close()
+    return io.BytesIO(data)
+
+
+@pytest.mark.parametrize("with_image, offered", [(True, True), (False, False)])
+def test_archive_only_offered_for_files(client, with_image, offered):
+    resp = client.post("/extract-images", data={"file": (_pdf(with_image), "in.pdf"), "min_kb": "0"},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200
+    assert (b"Download All (ZIP)" in resp.data) is offered
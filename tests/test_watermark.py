@@ -0,0 +1,33 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from pdf_ops import tools
+
+
+@pytest.fixture(autouse=True)
+def outputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "OUTPUTS", str(tmp_path))
+
+
+def _pdf(path, pages, text):
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_pdf_watermark_with_opacity(tmp_path):
+    src = _pdf(tmp_path / "in.pdf", 3, "body")
+    wm = _pdf(tmp_path / "wm.pdf", 1, "WATERMARK")
+
+    out = tools.watermark_pdf(src, watermark_pdf_path=wm, opacity=0.3)
+
+    with fitz.open(out) as doc:
+        assert doc.page_count == 3
+        assert all("WATERMARK" in page.get_text() for page in doc)
+        states = [doc.xref_object(x) for x in range(1, doc.xref_length())
+                  if "/ExtGState" in doc.xref_object(x) or "/CA " in doc.xref_object(x)]
+        assert any("/CA .3" in o or "/CA 0.3" in o for o in states)